@@ -0,0 +1,188 @@
+"""
+Алгоритм A* поиска кратчайшего пути между двумя вершинами графа.
+
+Дано:   взвешенный ориентированный граф G(V, E) без дуг отрицательного веса
+        и эвристика h(v, t) - нижняя оценка стоимости пути от "v" до "t".
+Задача: найти кратчайший путь от вершины "s" до вершины "t".
+"""
+from array import array
+from math import hypot
+from typing import Callable, Iterable, Sequence
+from dijkstra import CostsType, PathType, build_path, settle
+from graphs import DGraph, Graph
+
+HeuristicType = Callable[[int, int], float | int]    # h(v, target)
+
+
+def euclidean(xs: Sequence[float], ys: Sequence[float], scale: float = 1.0) -> HeuristicType:
+    """The straight-line distance between verticies with coordinates (xs[v], ys[v]).
+
+    It is consistent if no arrow is cheaper than "scale" times its length.
+    """
+
+    def h(v: int, target: int) -> float:
+        return scale * hypot(xs[v] - xs[target], ys[v] - ys[target])
+
+    return h
+
+
+def manhattan(xs: Sequence[float], ys: Sequence[float], scale: float = 1.0) -> HeuristicType:
+    """The grid distance between verticies with coordinates (xs[v], ys[v])"""
+
+    def h(v: int, target: int) -> float:
+        return scale * (abs(xs[v] - xs[target]) + abs(ys[v] - ys[target]))
+
+    return h
+
+
+class Landmarks:
+    """The ALT heuristic: landmarks and the triangle inequality.
+
+    Costs from every landmark "L" and to it are computed once per graph, then
+    h(v, t) = max over L of d(L, t) - d(L, v) and d(v, L) - d(t, L).
+    The tables are valid for the version of the graph they were built on.
+    """
+
+    def __init__(self, G: Graph, landmarks: int | Iterable[int] = 4,
+            reverse: Graph | None = None) -> None:
+
+        self.__n: int = len(G.verticies)    # The number of verticies
+        self.__version: int = G.version
+        if reverse is None:
+            reverse = G.reversed_graph if isinstance(G, DGraph) else G
+
+        self.__landmarks: list[int] = []
+        self.__from: list[array] = []    # d(L, v) for every landmark "L"
+        self.__to: list[array] = []    # d(v, L) for every landmark "L"
+
+        if isinstance(landmarks, int):
+            self.__farthest(G, landmarks)
+        else:
+            for L in landmarks:
+                self.__landmarks.append(L)
+                self.__from.append(self.__costs(G, L))
+
+        self.__to = [self.__costs(reverse, L) for L in self.__landmarks]
+
+    def __costs(self, G: Graph, start: int) -> array:
+        """Costs from "start" to all verticies, inf for unreachable ones"""
+
+        D: CostsType = {}
+        for _ in settle(G, start, D, {}):
+            pass
+
+        costs: array = array('d', [float('inf')]) * self.__n
+        for v, cost in D.items():
+            costs[v] = cost
+        return costs
+
+    def __farthest(self, G: Graph, k: int) -> None:
+        """Chooses "k" landmarks, every next one is the farthest from the chosen ones"""
+
+        inf = float('inf')
+        nearest: array = self.__costs(G, 0)    # The cost from the nearest landmark (from 0 at first)
+
+        while len(self.__landmarks) < min(k, self.__n):
+
+            L: int = max((u for u in range(self.__n) if u not in self.__landmarks),
+                    key=lambda u: (nearest[u] < inf, nearest[u]))
+            costs: array = self.__costs(G, L)
+
+            self.__landmarks.append(L)
+            self.__from.append(costs)
+            for u in range(self.__n):
+                nearest[u] = min(nearest[u], costs[u])
+
+    def __call__(self, v: int, target: int) -> float | int:
+
+        inf = float('inf')
+        h: float | int = 0
+
+        for d_from, d_to in zip(self.__from, self.__to):
+
+            # If "L" reaches "v" but not "target", or "target" reaches "L" but "v"
+            # does not, then there is no path from "v" to "target"
+            if d_from[v] < inf and d_from[target] == inf or d_to[target] < inf and d_to[v] == inf:
+                return inf
+
+            if d_from[target] < inf:
+                h = max(h, d_from[target] - d_from[v])
+            if d_to[v] < inf:
+                h = max(h, d_to[v] - d_to[target])
+
+        return h
+
+    @property
+    def landmarks(self) -> list[int]:
+        return self.__landmarks
+
+    @property
+    def version(self) -> int:
+        """The version of the graph the tables were built on"""
+        return self.__version
+
+
+class AStar:
+    """A* search: Dijkstra's algorithm led to the target by a heuristic"""
+
+    def __init__(self, G: Graph, heuristic: HeuristicType) -> None:
+        self.__G: Graph = G
+        self.__heuristic: HeuristicType = heuristic
+        self.__settled: int = 0    # Verticies settled by the last run
+
+    def run(self, start: int, end: int) -> PathType:
+        """Returns the cost and the path from "start" to "end", (inf, []) if there is no path"""
+
+        D: CostsType = {}    # Path costs
+        P: dict[int, int] = {}    # Predecessors
+        self.__settled = 0
+
+        for dist, u in settle(self.__G, start, D, P, lambda v: self.__heuristic(v, end)):
+
+            self.__settled += 1
+            if u == end:
+                return dist, build_path(P, end)
+
+        return float('inf'), []
+
+    @property
+    def settled(self) -> int:
+        """The number of verticies settled by the last run"""
+        return self.__settled
+
+
+if __name__ == '__main__':
+
+    txt = "A* is a graph traversal and path search algorithm, it uses heuristics to guide its search."
+    print(txt)
+
+    # The grid "size" × "size" with the vertex v = x + size*y at (x, y)
+    size: int = 20
+    xs: list[int] = [v % size for v in range(size * size)]
+    ys: list[int] = [v // size for v in range(size * size)]
+
+    G = DGraph(size * size, weighted=True, storage='csr')
+    for v in range(size * size):
+        if xs[v] + 1 < size:
+            G.add_arrow(v, v + 1, 2)
+            G.add_arrow(v + 1, v, 2)
+        if ys[v] + 1 < size:
+            G.add_arrow(v, v + size, 3)
+            G.add_arrow(v + size, v, 3)
+
+    start, end = size * (size // 2), size * (size // 2) + size - 1    # Across the middle row
+    expected_cost = 2 * (size - 1)
+
+    for name, heuristic in [('zero', lambda v, t: 0), ('euclidean', euclidean(xs, ys, scale=2)),
+            ('manhattan', manhattan(xs, ys, scale=2)), ('landmarks', Landmarks(G, 4))]:
+
+        astar = AStar(G, heuristic)
+        cost, path = astar.run(start, end)
+
+        assert cost == expected_cost, f"Something wrong with A* with the {name} heuristic"
+        assert path[0] == start and path[-1] == end and len(path) == size, "Something wrong with the path of A*"
+        print(f"Heuristic {name}: cost {cost}, settled {astar.settled} of {size * size} verticies")
+
+    alt = Landmarks(G, [end])
+    assert AStar(G, alt).run(start, end)[0] == expected_cost, "Something wrong with the given landmarks"
+    assert AStar(G, alt).run(end, end) == (0, [end]), "Something wrong with the empty path"
@@ -5,6 +5,7 @@
 Задача:  обойти все вершины графа "G".
 """
 
+from typing import Mapping
 from graphs import UGraph
 import time
 
@@ -12,7 +13,7 @@ import time
 class Bfs:
 
     def __init__(self, G: UGraph, init_vert: int) -> None:
-        self.__adj_list: dict[int, list[int]]
+        self.__adj_list: Mapping[int, tuple[int, ...]]
         self.__adj_list= G.adjacency_list   # The adjacency list of the graph
 
         self.__run(init_vert)
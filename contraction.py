@@ -0,0 +1,371 @@
+"""
+Иерархии сжатия (Contraction Hierarchies) - предобработка графа для быстрых
+запросов кратчайшего пути между двумя вершинами.
+
+Дано:   взвешенный ориентированный граф G(V, E) без дуг отрицательного веса.
+Задача: после однократной предобработки быстро находить кратчайшие пути
+        между любыми вершинами "s" и "t".
+"""
+from array import array
+from heapq import heapify, heappop, heappush
+from dijkstra import PathType
+from graphs import BinaryFile, Graph, as_weights, typecode_of
+
+# The hierarchy file: weight type, n, m up, m down and the arrays
+#   rank[n], then for the upward and the downward graphs
+#   offsets[n + 1], targets[m], weights[m] ('q' or 'd'), middles[m]
+_HIERARCHY_FILE = BinaryFile(b'CHRC', 'cxxqqq', 'a contraction hierarchy')
+
+
+def _hierarchy_layout(wtype: bytes, n: int, m_up: int, m_down: int) -> list[tuple[int, str]]:
+
+    layout: list[tuple[int, str]] = [(n, 'q')]
+    for m in (m_up, m_down):
+        layout += [(n + 1, 'q'), (m, 'q'), (m, wtype.decode()), (m, 'q')]
+    return layout
+
+
+class ContractionHierarchy:
+    """Contraction hierarchies.
+
+    Verticies are contracted one by one in the order of the edge difference
+    (shortcuts added minus arrows removed, plus contracted neighbors), a
+    shortcut (u, x) over "v" is added unless a witness path not longer than
+    u -> v -> x is found by a local search limited to "settle_limit" verticies.
+    A query is a bidirectional Dijkstra which only goes up in the order:
+    forward from "s" over the upward arrows, backward from "t" over the
+    downward ones. Shortcuts keep their middle vertex to unpack paths.
+    """
+
+    def __init__(self, G: Graph, settle_limit: int = 64) -> None:
+        self.__n: int = len(G.verticies)    # The number of verticies
+        self.__settle_limit: int = settle_limit
+
+        self.__rank: array | memoryview    # The order of contraction
+        self.__up: tuple    # The upward graph: offsets, targets, weights, middles
+        self.__down: tuple    # The downward graph reversed: offsets, targets, weights, middles
+        self.__settled: int = 0    # Verticies settled by the last query
+
+        self.__build(G)
+
+    def __build(self, G: Graph) -> None:
+        """Contract all verticies and build the upward and the downward graphs"""
+
+        n: int = self.__n
+        inf = float('inf')
+
+        self.__out: list[dict[int, float | int]] = [{} for _ in range(n)]    # The arrows from a vertex
+        self.__inc: list[dict[int, float | int]] = [{} for _ in range(n)]    # The arrows to a vertex
+        self.__contracted: bytearray = bytearray(n)
+        middle: dict[tuple[int, int], int] = {}    # Shortcut: the contracted vertex
+
+        for u in range(n):
+            for v, w in G.neighbors(u):
+                if w < self.__out[u].get(v, inf):
+                    self.__out[u][v] = w
+                    self.__inc[v][u] = w
+
+        deleted: array = array('q', bytes(8 * n))    # Contracted neighbors of a vertex
+        rank: array = array('q', bytes(8 * n))
+
+        heap: list[tuple[int, int]] = []
+        for v in range(n):
+            heap.append((self.__priority(v, self.__shortcuts(v), deleted), v))
+        heapify(heap)
+
+        order: int = 0
+        while heap:
+
+            _, v = heappop(heap)
+            shortcuts = self.__shortcuts(v)
+            priority: int = self.__priority(v, shortcuts, deleted)
+
+            if heap and priority > heap[0][0]:    # Lazy update of the priority
+                heappush(heap, (priority, v))
+                continue
+
+            for u, x, cost in shortcuts:
+                if cost < self.__out[u].get(x, inf):
+                    self.__out[u][x] = cost
+                    self.__inc[x][u] = cost
+                    middle[u, x] = v
+
+            self.__contracted[v] = 1
+            rank[v] = order
+            order += 1
+
+            for u in (*self.__inc[v], *self.__out[v]):
+                deleted[u] += 1
+
+        self.__rank = rank
+        self.__up = self.__csr(lambda u, x: rank[u] < rank[x], middle, False)
+        self.__down = self.__csr(lambda u, x: rank[u] > rank[x], middle, True)
+
+        del self.__out, self.__inc, self.__contracted
+
+    def __csr(self, keep, middle: dict[tuple[int, int], int], reverse: bool) -> tuple:
+        """The arrows (u, x) kept by "keep" in the compressed sparse row layout.
+
+        With "reverse" the row of "x" holds the arrows (u, x) as (x, u).
+        """
+
+        n: int = self.__n
+        rows: list[list[tuple[int, float | int, int]]] = [[] for _ in range(n)]
+
+        for u in range(n):
+            for x, w in self.__out[u].items():
+                if keep(u, x):
+                    a, b = (x, u) if reverse else (u, x)
+                    rows[a].append((b, w, middle.get((u, x), -1)))
+
+        offsets: array = array('q', [0])
+        targets: array = array('q')
+        weights: list[float | int] = []
+        middles: array = array('q')
+
+        for row in rows:
+            for b, w, m in row:
+                targets.append(b)
+                weights.append(w)
+                middles.append(m)
+            offsets.append(len(targets))
+
+        return offsets, targets, as_weights(weights), middles
+
+    def __shortcuts(self, v: int) -> list[tuple[int, int, float | int]]:
+        """Shortcuts (u, x, cost) needed to contract "v"."""
+
+        contracted = self.__contracted
+        ins = [(u, w) for u, w in self.__inc[v].items() if not contracted[u] and u != v]
+        outs = [(x, w) for x, w in self.__out[v].items() if not contracted[x] and x != v]
+
+        shortcuts: list[tuple[int, int, float | int]] = []
+        for u, wu in ins:
+
+            targets: dict[int, float | int] = {x: wu + wx for x, wx in outs if x != u}
+            if not targets:
+                continue
+
+            D = self.__witness(u, v, max(targets.values()), set(targets))
+            for x, cost in targets.items():
+                if D.get(x, float('inf')) > cost:
+                    shortcuts.append((u, x, cost))
+
+        return shortcuts
+
+    def __witness(self, start: int, v: int, limit: float | int, targets: set[int]
+            ) -> dict[int, float | int]:
+        """The local search from "start" avoiding "v", costs not above "limit"."""
+
+        D: dict[int, float | int] = {start: 0}
+        heap: list[tuple[float | int, int]] = [(0, start)]
+        settled: int = 0
+
+        while heap and settled < self.__settle_limit and targets:
+
+            dist, u = heappop(heap)
+            if dist > D[u]:
+                continue
+            if dist > limit:
+                break
+
+            settled += 1
+            targets.discard(u)
+
+            for x, w in self.__out[u].items():
+                if x == v or self.__contracted[x]:
+                    continue
+                new_cost = dist + w
+                if new_cost < D.get(x, float('inf')):
+                    D[x] = new_cost
+                    heappush(heap, (new_cost, x))
+
+        return D
+
+    def __priority(self, v: int, shortcuts: list, deleted: array) -> int:
+        """The edge difference plus the contracted neighbors"""
+
+        contracted = self.__contracted
+        removed: int = sum(1 for u in self.__inc[v] if not contracted[u])
+        removed += sum(1 for x in self.__out[v] if not contracted[x])
+        return len(shortcuts) - removed + deleted[v]
+
+    def query(self, start: int, end: int) -> PathType:
+        """Returns the cost and the path from "start" to "end", (inf, []) if there is no path"""
+
+        inf = float('inf')
+        D: tuple[dict, dict] = ({start: 0}, {end: 0})    # Forward and backward costs
+        P: tuple[dict, dict] = ({start: -1}, {end: -1})    # Forward and backward predecessors
+        heaps: tuple[list, list] = ([(0, start)], [(0, end)])
+        graphs: tuple = (self.__up, self.__down)
+
+        mu: float | int = inf    # The cost of the best path found
+        meet: int = -1
+        self.__settled = 0
+
+        while heaps[0] or heaps[1]:
+            for side in (0, 1):
+
+                heap = heaps[side]
+                if not heap:
+                    continue
+                if heap[0][0] >= mu:    # This search can not improve the path
+                    heap.clear()
+                    continue
+
+                dist, u = heappop(heap)
+                if dist > D[side][u]:
+                    continue
+                self.__settled += 1
+
+                cost = dist + D[1 - side].get(u, inf)
+                if cost < mu:
+                    mu, meet = cost, u
+
+                offsets, targets, weights, _ = graphs[side]
+                for k in range(offsets[u], offsets[u + 1]):
+                    x = targets[k]
+                    new_cost = dist + weights[k]
+                    if new_cost < D[side].get(x, inf):
+                        D[side][x] = new_cost
+                        P[side][x] = u
+                        heappush(heap, (new_cost, x))
+
+        if meet == -1:
+            return inf, []
+
+        hierarchy: list[int] = []    # The path over shortcuts
+        v: int = meet
+        while v != -1:
+            hierarchy.append(v)
+            v = P[0][v]
+        hierarchy.reverse()
+        v = P[1][meet]
+        while v != -1:
+            hierarchy.append(v)
+            v = P[1][v]
+
+        path: list[int] = [start]
+        for u, x in zip(hierarchy, hierarchy[1:]):
+            self.__unpack(u, x, path)
+
+        return mu, path
+
+    def __unpack(self, u: int, x: int, path: list[int]) -> None:
+        """Appends the verticies of the arrow (u, x) without "u" to the path"""
+
+        if self.__rank[u] < self.__rank[x]:
+            offsets, targets, _, middles = self.__up
+            a, b = u, x
+        else:
+            offsets, targets, _, middles = self.__down
+            a, b = x, u
+
+        m: int = -1
+        for k in range(offsets[a], offsets[a + 1]):
+            if targets[k] == b:
+                m = middles[k]
+                break
+
+        if m == -1:
+            path.append(x)
+        else:
+            self.__unpack(u, m, path)
+            self.__unpack(m, x, path)
+
+    def save(self, path: str) -> None:
+        """Writes the hierarchy to the binary file "path" (see "load")"""
+
+        fields: tuple = (typecode_of(self.__up[2]).encode(), self.__n, len(self.__up[1]), len(self.__down[1]))
+        _HIERARCHY_FILE.write(path, fields, (self.__rank, *self.__up, *self.__down))
+
+    @classmethod
+    def load(cls, path: str) -> "ContractionHierarchy":
+        """Opens the hierarchy saved by "save", the arrays are read from the mapped file"""
+
+        (_, n, _, _), buffers = _HIERARCHY_FILE.map(path, _hierarchy_layout)
+
+        ch = cls.__new__(cls)
+        ch.__n = n
+        ch.__rank = buffers[0]
+        ch.__up = tuple(buffers[1:5])
+        ch.__down = tuple(buffers[5:9])
+        ch.__settled = 0
+        return ch
+
+    @property
+    def rank(self) -> array | memoryview:
+        """The order of contraction of verticies"""
+        return self.__rank
+
+    @property
+    def n_shortcuts(self) -> int:
+        return sum(1 for m in self.__up[3] if m != -1) + sum(1 for m in self.__down[3] if m != -1)
+
+    @property
+    def settled(self) -> int:
+        """The number of verticies settled by the last query"""
+        return self.__settled
+
+
+if __name__ == '__main__':
+
+    import os
+    import random
+    import tempfile
+    import time
+    from dijkstra import shortest_path
+    from graphs import DGraph
+
+    txt = "Contraction hierarchies speed up shortest-path queries after preprocessing the graph."
+    print(txt)
+
+    # The grid "size" × "size" of two-way roads with random weights
+    SEED = 32
+    size: int = 30
+    random.seed(SEED)
+
+    G = DGraph(size * size, weighted=True, storage='csr')
+    for v in range(size * size):
+        for x in ((v + 1) if (v + 1) % size else -1, v + size):
+            if 0 < x < size * size:
+                G.add_arrow(v, x, random.randint(1, 9))
+                G.add_arrow(x, v, random.randint(1, 9))
+
+    started = time.perf_counter()
+    ch = ContractionHierarchy(G)
+    print(f"Preprocessing: {time.perf_counter() - started:.2f} s, {ch.n_shortcuts} shortcuts")
+
+    queries = [(random.randrange(size * size), random.randrange(size * size)) for _ in range(100)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ch.bin')
+        ch.save(path)
+        loaded = ContractionHierarchy.load(path)
+
+        for s, t in queries:
+            cost, route = shortest_path(G, s, t)
+            assert ch.query(s, t)[0] == cost, "Something wrong with the contraction hierarchy"
+
+            cost_ch, route_ch = loaded.query(s, t)
+            assert cost_ch == cost and route_ch[0] == s and route_ch[-1] == t, "Something wrong with the loaded hierarchy"
+            assert sum(G.weight(u, x) for u, x in zip(route_ch, route_ch[1:])) == cost, "Something wrong with unpacking a path"
+
+    started = time.perf_counter()
+    for s, t in queries:
+        shortest_path(G, s, t)
+    dijkstra_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for s, t in queries:
+        ch.query(s, t)
+    ch_time = time.perf_counter() - started
+
+    print(f"Queries: Dijkstra {dijkstra_time:.3f} s, contraction hierarchy {ch_time:.3f} s")
+
+    assert ch.query(queries[0][0], queries[0][0]) == (0, [queries[0][0]]), "Something wrong with the empty path"
+
+    H = DGraph(3, weighted=True)
+    H.add_arrow(0, 1, 5)
+    assert ContractionHierarchy(H).query(0, 1) == (5, [0, 1]), "Something wrong with a single arrow"
+    assert ContractionHierarchy(H).query(1, 0) == (float('inf'), []), "Something wrong with an unreachable vertex"
@@ -4,13 +4,13 @@
 Дано: Связный неориентированный граф "G(V, E)". 
 Задача: обойти все вершины графа. Вычислить в циклы "c" в графе "G".
 """
-from typing import Iterable
+from typing import Iterable, Mapping
 from graphs import UGraph
 
 class Dfs:
 
     def __init__(self, G: UGraph, u: int):
-        self.__adj_list: dict[int, list[int]] = G.adjacency_list    # The adjacency list
+        self.__adj_list: Mapping[int, tuple[int, ...]] = G.adjacency_list    # The adjacency list
         self.__cycles: list[Iterable[int]]= []
         self.__run(u, [])
 
@@ -36,8 +36,8 @@ class Dfs:
         
         stack.append(u)
 
-        alist: list[int] | None     # list of adjacent verticies of u
-        alist = graph.adjacency_list.get(u)    
+        alist: tuple[int, ...] | None     # tuple of adjacent verticies of u
+        alist = self.__adj_list.get(u)
 
         if alist:
             for u in alist:
@@ -5,53 +5,477 @@
 Задача: найти кратчайшие пути от заданной вершины "а" графа "G"
         до всех остальных вершин этого графа.
 """
-from queue import PriorityQueue
-from graphs import DGraph
+from array import array
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappop, heappush
+from multiprocessing.shared_memory import SharedMemory
+import os
+import sys
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, Sequence
+from graphs import DGraph, Graph
 
 CostsType = dict[int, float | int]
+PathType = tuple[float | int, list[int]]    # The cost and the verticies of a path
+
+
+QUEUES: tuple[str, ...] = ('auto', 'heap', 'dial', 'radix')    # Priority queues of "settle"
+_DIAL_MAX_WEIGHT: int = 64    # 'auto' uses Dial's buckets up to this maximum weight
+
+
+class _HeapQueue:
+    """The binary heap: any keys. O(log n) push and pop"""
+
+    def __init__(self) -> None:
+        self.__heap: list[tuple[float | int, int]] = []
+
+    def push(self, key: float | int, v: int) -> None:
+        heappush(self.__heap, (key, v))
+
+    def pop(self) -> tuple[float | int, int]:
+        return heappop(self.__heap)
+
+    def __len__(self) -> int:
+        return len(self.__heap)
+
+
+class _DialQueue:
+    """Dial's buckets: integer keys from the last popped key to it plus "max_weight".
+
+    A circular array of max_weight + 1 buckets, a bucket holds the verticies
+    with the same key. O(1) push, pop scans the empty buckets, so the whole
+    search is O(E + V * max_weight) at worst and O(E + max cost) in fact.
+    """
+
+    def __init__(self, max_weight: int) -> None:
+        self.__buckets: list[list[int]] = [[] for _ in range(max_weight + 1)]
+        self.__key: int = 0    # The key of the current bucket
+        self.__size: int = 0
+
+    def push(self, key: int, v: int) -> None:
+        self.__buckets[key % len(self.__buckets)].append(v)
+        self.__size += 1
+
+    def pop(self) -> tuple[int, int]:
+
+        buckets = self.__buckets
+        key: int = self.__key
+        while not buckets[key % len(buckets)]:
+            key += 1
+
+        self.__key = key
+        self.__size -= 1
+        return key, buckets[key % len(buckets)].pop()
+
+    def __len__(self) -> int:
+        return self.__size
+
+
+class _RadixQueue:
+    """The radix heap: integer keys not less than the last popped key.
+
+    The bucket "i" holds the keys which differ from the last popped key in
+    the bit i - 1 at most, pop redistributes the first non-empty bucket by the
+    new minimum, so every entry moves O(log C) times (C is the maximum weight).
+    """
+
+    def __init__(self) -> None:
+        self.__buckets: list[list[tuple[int, int]]] = [[] for _ in range(65)]
+        self.__last: int = 0    # The last popped key
+        self.__size: int = 0
+
+    def push(self, key: int, v: int) -> None:
+        self.__buckets[(key ^ self.__last).bit_length()].append((key, v))
+        self.__size += 1
+
+    def pop(self) -> tuple[int, int]:
+
+        buckets = self.__buckets
+        if not buckets[0]:
+
+            i: int = 1
+            while not buckets[i]:
+                i += 1
+
+            bucket = buckets[i]
+            buckets[i] = []
+            last: int = min(bucket)[0]
+            for key, v in bucket:
+                buckets[(key ^ last).bit_length()].append((key, v))
+            self.__last = last
+
+        self.__size -= 1
+        return buckets[0].pop()
+
+    def __len__(self) -> int:
+        return self.__size
+
+
+def _make_queue(G: Graph, queue: str, heuristic: Callable[[int], float | int] | None
+        ) -> _HeapQueue | _DialQueue | _RadixQueue:
+    """The priority queue "queue" for a search on "G", 'auto' picks one by the weights.
+
+    Dial's buckets and the radix heap need non-negative integer weights and
+    no heuristic. 'auto' chooses Dial's buckets for weights up to
+    _DIAL_MAX_WEIGHT and the binary heap otherwise: the radix heap does no
+    better than "heapq" in pure Python, it is kept to compare them.
+    """
+
+    if queue not in QUEUES:
+        raise ValueError(f"Unknown queue: {queue!r}")
+    if queue == 'heap':
+        return _HeapQueue()
+
+    max_weight: int | None = G.max_int_weight if heuristic is None else None
+    if max_weight is None:
+        if queue == 'auto':
+            return _HeapQueue()
+        raise ValueError(f"The {queue!r} queue needs non-negative integer weights and no heuristic")
+
+    if queue == 'radix':
+        return _RadixQueue()
+    if queue == 'dial' or max_weight <= _DIAL_MAX_WEIGHT:
+        return _DialQueue(max_weight)
+    return _HeapQueue()
+
+
+def settle(G: Graph, start: int, D: CostsType, P: dict[int, int],
+        heuristic: Callable[[int], float | int] | None = None, queue: str = 'auto'
+        ) -> Iterator[tuple[float | int, int]]:
+    """Settles verticies in the order of their costs from "start", yields (cost, vertex).
+
+    Costs "D" and predecessors "P" are filled in place, only for the reached
+    verticies, so the caller may stop early and pay only for what is settled.
+    With a consistent "heuristic" (a lower bound of the cost from a vertex to
+    the target) the verticies are settled in the order of cost + heuristic (A*).
+    The priority "queue" is one of QUEUES, see "_make_queue".
+    """
+
+    D[start] = 0
+    P[start] = -1
+    unvisited = _make_queue(G, queue, heuristic)    # Unvisited container
+    push, pop = unvisited.push, unvisited.pop
+    push(0, start)
+    U: set[int] = set()    # Visited set
+
+    while unvisited:
+
+        _, u = pop()
+        if u in U:    # A stale entry, u is reached by a shorter path
+            continue
+        U.add(u)
+        dist = D[u]
+
+        for v, w in G.neighbors(u):
+
+            new_cost = dist + w
+
+            if new_cost < D.get(v, float('inf')):
+
+                D[v] = new_cost
+                P[v] = u
+                push(new_cost if heuristic is None else new_cost + heuristic(v), v)
+
+        yield dist, u    # After relaxing, so D has the arrows of u
+
+
+def build_path(P: dict[int, int] | array, end: int) -> list[int]:
+    """Walks the predecessors back from "end". O(path length)"""
+
+    path: list[int] = []
+    v: int = end
+
+    while v != -1:
+        path.append(v)
+        v = P[v]
+
+    path.reverse()
+    return path
+
+
+def shortest_path(G: Graph, start: int, end: int, bidirectional: bool = False,
+        reverse: Graph | None = None, queue: str = 'auto') -> PathType:
+    """Returns the cost and the path from "start" to "end", (inf, []) if there is no path.
+
+    The search stops as soon as "end" is settled. The bidirectional search
+    runs forward from "start" on "G" and backward from "end" on "reverse"
+    (G.reversed_graph by default, "G" itself for an undirected graph) and stops
+    when the searches meet, settling far fewer verticies on long paths.
+    The priority "queue" is one of QUEUES, see "_make_queue".
+    """
+
+    if bidirectional:
+        return _bidirectional(G, start, end, reverse, queue)
+
+    D: CostsType = {}
+    P: dict[int, int] = {}
+
+    for dist, u in settle(G, start, D, P, queue=queue):
+        if u == end:
+            return dist, build_path(P, end)
+
+    return float('inf'), []
+
+
+def _bidirectional(G: Graph, start: int, end: int, reverse: Graph | None, queue: str) -> PathType:
+
+    if reverse is None:
+        reverse = G.reversed_graph if isinstance(G, DGraph) else G
+
+    Df: CostsType = {}    # Forward costs
+    Db: CostsType = {}    # Backward costs
+    Pf: dict[int, int] = {}    # Forward predecessors
+    Pb: dict[int, int] = {}    # Backward predecessors: the next vertex towards "end"
+
+    searches = [(settle(G, start, Df, Pf, queue=queue), Db), (settle(reverse, end, Db, Pb, queue=queue), Df)]
+    last: list[float | int] = [0, 0]    # The last settled cost of every search
+
+    mu: float | int = float('inf')    # The cost of the best path found
+    meet: int = -1    # The vertex where the searches met on the best path
+
+    turns: Iterator[int] = iter((0, 1))    # Both searches settle their first vertex
+
+    while last[0] + last[1] < mu:
+
+        side: int = next(turns, 0 if last[0] <= last[1] else 1)
+        search, other = searches[side]
+
+        try:
+            dist, u = next(search)
+        except StopIteration:
+            last[side] = float('inf')
+            continue
+
+        last[side] = dist
+        cost = dist + other.get(u, float('inf'))
+        if cost < mu:
+            mu, meet = cost, u
+
+    if meet == -1:
+        return float('inf'), []
+
+    path: list[int] = build_path(Pf, meet)
+    v: int = Pb[meet]
+    while v != -1:
+        path.append(v)
+        v = Pb[v]
+
+    return mu, path
+
+
+def _fill_costs(G: Graph, start: int, row: memoryview | array) -> None:
+    """Writes costs from "start" to all verticies into "row", inf for unreachable ones"""
+
+    D: CostsType = {}
+    for _ in settle(G, start, D, {}):
+        pass
+
+    row[:] = array('d', [float('inf')]) * len(row)
+    for v, cost in D.items():
+        row[v] = cost
+
+
+# The state of a worker process of "run_batches" built from the mapped graph
+_worker_state: Any
+
+
+def _init_worker(path: str, setup: Callable[..., Any], args: tuple) -> None:
+
+    global _worker_state
+    _worker_state = setup(Graph.load(path), *args)    # Mapped from the file, pages are shared
+
+
+def _run_batch(task: Callable[[Any, Any], Any], batch: Any) -> Any:
+    return task(_worker_state, batch)
+
+
+def _graph_state(G: Graph) -> Graph:
+    return G
+
+
+def run_batches(G: Graph, task: Callable[[Any, Any], Any], batches: Iterable[Any], workers: int,
+        setup: Callable[..., Any] = _graph_state, *args: Any) -> list[Any]:
+    """Runs task(state, batch) for every batch by a pool of "workers" processes.
+
+    The graph is written once to a temporary graph file which every worker
+    maps to memory, so the graph is not pickled. The state of a worker is
+    setup(graph, *args) built once from the mapped graph (the graph itself by
+    default). "task", "setup" and "args" must be picklable: module functions.
+    Returns the results in the order of the batches.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, 'graph.bin')
+        G.save(path)
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                initargs=(path, setup, args)) as pool:
+            return list(pool.map(partial(_run_batch, task), batches))
+
+
+def _attach_table(G: Graph, table: str) -> tuple[Graph, SharedMemory]:
+    return G, SharedMemory(name=table)
+
+
+def _run_sources(state: tuple[Graph, SharedMemory], rows: list[tuple[int, int]]) -> None:
+    """Fills the rows (index, source) of the shared distance table"""
+
+    G, shm = state
+    n: int = len(G.verticies)
+    table: memoryview = shm.buf.cast('d')
+
+    for i, start in rows:
+        _fill_costs(G, start, table[i * n:(i + 1) * n])
+
+    table.release()
+
+
+def multi_source(G: Graph, sources: Sequence[int], workers: int | None = None,
+        batch: int = 16) -> array:
+    """Costs from every source to all verticies as one table len(sources) × V.
+
+    The row "i" is table[i*V:(i+1)*V], inf for unreachable verticies. The
+    sources are split into batches and run by a pool of "workers" processes
+    (os.cpu_count() by default) with "run_batches", the rows are written to
+    shared memory, so neither the graph nor the table is pickled.
+    """
+
+    n: int = len(G.verticies)
+    workers = workers or os.cpu_count() or 1
+    table: array = array('d', bytes(8 * n * len(sources)))
+
+    if workers == 1 or len(sources) <= batch:
+        for i, start in enumerate(sources):
+            _fill_costs(G, start, memoryview(table)[i * n:(i + 1) * n])
+        return table
+
+    rows: list[tuple[int, int]] = list(enumerate(sources))
+    shm = SharedMemory(create=True, size=max(len(table) * 8, 1))
+
+    try:
+        run_batches(G, _run_sources, [rows[k:k + batch] for k in range(0, len(rows), batch)],
+                workers, _attach_table, shm.name)
+        memoryview(table).cast('B')[:] = shm.buf[:len(table) * 8]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return table
+
 
 class Dijkstra:
-    def __init__(self, G: DGraph, start: int) -> None:
+    def __init__(self, G: DGraph, start: int, queue: str = 'auto') -> None:
         self.__n: int = len(G.verticies)    # The number of verticies
-        self.__matrix: list[list[int]] = G.cost_matrix    # type: ignore
+        self.__G: DGraph = G
+        self.__queue: str = queue    # The priority queue, one of QUEUES
 
         self.__D: CostsType    # Path costs
-        self.__D = {v: float('inf') for v in range(self.__n)}
-        self.__D[start] = 0
-
-        self.__run()
-
-    def __run(self) -> None:
-        """Run the Dijkstra's algorithm"""
-       
-        pq = PriorityQueue()    # Unvisited container 
-        pq.put((0, start))
-        U = {start}    # Visited set
-        
-        while not pq.empty():
-            
-            dist, u = pq.get()
-            U.add(u)
-            
-            for v in range(self.__n):
-                
-                w = self.__matrix[u][v]
-                
-                if w != -1 and v not in U:
-                    
-                    old_cost = self.__D[v]
-                    new_cost = dist + self.__matrix[u][v]
-                    
-                    if  new_cost < old_cost:
-                        
-                        self.__D[v] = new_cost
-                        pq.put((new_cost, v))
-                        
+        self.__P: array    # Predecessors in the shortest-path tree, -1 for the root and unreached
+        self.__run(start)
+
+    def __run(self, start: int) -> None:
+        """Run the Dijkstra's algorithm. O((V + E) log V)"""
+
+        D: CostsType = {}    # Path costs of reached verticies
+        P: dict[int, int] = {}    # Predecessors
+
+        for _ in settle(self.__G, start, D, P, queue=self.__queue):
+            pass
+
+        self.__D = {v: D.get(v, float('inf')) for v in range(self.__n)}
+        self.__P = array('q', [-1]) * self.__n
+        for v, u in P.items():
+            self.__P[v] = u
+
+    def path(self, end: int) -> list[int]:
+        """Returns the shortest path to "end", [] if it is unreachable. O(path length)"""
+
+        if self.__D[end] == float('inf'):
+            return []
+        return build_path(self.__P, end)    # type: ignore
+
     @property
     def costs(self) -> CostsType:
         """Returns the path costs"""
         return self.__D
 
+    @property
+    def predecessors(self) -> array:
+        """Returns the predecessors, -1 for the initial vertex and unreachable ones"""
+        return self.__P
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory taken by the costs and the predecessors"""
+
+        costs: int = sys.getsizeof(self.__D) + sum(sys.getsizeof(c) for c in self.__D.values())
+        return costs + self.__P.itemsize * len(self.__P)
+
+
+class TreeCache:
+    """The LRU cache of shortest-path trees (Dijkstra) of the graph.
+
+    Trees are keyed by (version of the graph, source), so a changed graph is
+    never served from stale trees. The least recently used trees are evicted
+    to keep the memory within "max_bytes".
+    """
+
+    def __init__(self, G: Graph, max_bytes: int = 64 << 20) -> None:
+        self.__G: Graph = G
+        self.__max_bytes: int = max_bytes
+
+        self.__trees: OrderedDict[tuple[int, int], Dijkstra] = OrderedDict()
+        self.__bytes: int = 0    # Memory taken by the trees
+        self.__hits: int = 0
+        self.__misses: int = 0
+
+    def get(self, source: int) -> Dijkstra:
+        """Returns the shortest-path tree from "source", computing it on a miss"""
+
+        key: tuple[int, int] = (self.__G.version, source)
+        tree: Dijkstra | None = self.__trees.get(key)
+
+        if tree is not None:
+            self.__hits += 1
+            self.__trees.move_to_end(key)
+            return tree
+
+        self.__misses += 1
+        tree = Dijkstra(self.__G, source)    # type: ignore
+        if tree.nbytes > self.__max_bytes:
+            return tree
+
+        self.__trees[key] = tree
+        self.__bytes += tree.nbytes
+
+        while self.__bytes > self.__max_bytes:
+            _, old = self.__trees.popitem(last=False)
+            self.__bytes -= old.nbytes
+
+        return tree
+
+    def clear(self) -> None:
+        self.__trees.clear()
+        self.__bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.__trees)
+
+    @property
+    def nbytes(self) -> int:
+        return self.__bytes
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+
 if __name__ == '__main__':
     
     txt = "Dijkstra's algorithm is an algorithm for finding the shortest paths between nodes in a graph." 
@@ -72,3 +496,51 @@ if __name__ == '__main__':
     print(f'Initial vertex is {start}. Costs are:')
     print(costs)
 
+    G_csr = DGraph(5, weighted=True, storage='csr')
+    for arrow in G.arrow_list:
+        G_csr.add_arrow(arrow[1], arrow[2], arrow[0])
+    assert Dijkstra(G_csr, start).costs == costs, "Something wrong with Dijkstra on the CSR graph"
+
+    # The graph with "gap" other than -1 and with an unreachable vertex
+    G_gap = DGraph(6, gap=0, weighted=True, storage='csr')
+    G_gap.add_edges_from(G.arrow_list)
+    assert Dijkstra(G_gap, start).costs == {**costs, 5: float('inf')}, "Something wrong with the gap of the graph"
+
+    # Point-to-point queries
+    assert shortest_path(G, 0, 4) == (9, [0, 2, 3, 4]), "Something wrong with the shortest path"
+    assert shortest_path(G, 0, 4, bidirectional=True) == (9, [0, 2, 3, 4]), "Something wrong with the bidirectional search"
+    assert shortest_path(G, 4, 0) == shortest_path(G, 4, 0, bidirectional=True) == (float('inf'), []), "There is no path from 4 to 0"
+    assert shortest_path(G, 1, 1, bidirectional=True) == (0, [1]), "Something wrong with the empty path"
+
+    # Priority queues for integer weights
+    for queue in QUEUES:
+        assert Dijkstra(G, start, queue=queue).costs == costs, f"Something wrong with the {queue!r} queue"
+        assert shortest_path(G, 0, 4, bidirectional=True, queue=queue) == (9, [0, 2, 3, 4]), f"Something wrong with the {queue!r} queue"
+
+    G_float = DGraph(2, weighted=True, storage='csr')
+    G_float.add_arrow(0, 1, 0.5)
+    assert Dijkstra(G_float, 0).costs == {0: 0, 1: 0.5}, "Something wrong with the queue for float weights"
+    try:
+        Dijkstra(G_float, 0, queue='dial')
+        assert False, "Dial's buckets need integer weights"
+    except ValueError:
+        pass
+
+    # Costs from many sources at once
+    sources = [0, 2, 3, 0]
+    table = multi_source(G, sources, workers=2, batch=1)
+    for i, source in enumerate(sources):
+        row = list(table[i * 5:(i + 1) * 5])
+        assert row == list(Dijkstra(G, source).costs.values()), "Something wrong with costs from many sources"
+
+    # Paths and the cache of shortest-path trees
+    assert djk.path(4) == [0, 2, 3, 4] and djk.path(0) == [0], "Something wrong with the path"
+    assert Dijkstra(G, 4).path(0) == [], "There is no path from 4 to 0"
+
+    cache = TreeCache(G, max_bytes=2 * djk.nbytes)
+    for source in (0, 1, 0, 2, 0, 1):
+        cache.get(source)
+    assert (cache.hits, cache.misses, len(cache)) == (2, 4, 2), "Something wrong with the LRU cache"
+
+    G.add_arrow(4, 0, 1)    # A new version of the graph
+    assert cache.get(4).path(0) == [4, 0] and cache.misses == 5, "A stale tree is served from the cache"
@@ -6,14 +6,51 @@
 Сложность: O(V**3)
 """
 
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
-from graphs import UGraph, Graph
+import math
+from multiprocessing.shared_memory import SharedMemory
+from numbers import Integral
+import os
+import tempfile
+from typing import Iterable, Iterator
+from dijkstra import CostsType, settle, run_batches
+from graphs import BinaryFile, DGraph, UGraph, Graph, typecode_of
 
-def floyd(G: Graph) -> tuple[list[list[int|float]], list[list[int]]]:
+try:
+    import numpy as np
+except ImportError:    # NumPy is needed only for engine='numpy'
+    np = None
+
+ENGINES: tuple[str, ...] = ('python', 'numpy', 'blocked', 'johnson')    # Engines of "floyd"
+
+
+def floyd(G: Graph, engine: str = 'python', dtype: str = 'float64'
+        ) -> tuple[list[list[int|float]], list[list[int]]]:
+    """Returns the cost matrix and the path matrix of the graph.
+
+    paths[i][j] is a vertex on the shortest path from "i" to "j", "j" itself
+    for the arrow (i, j). The engines 'numpy' and 'blocked' run "floyd_numpy"
+    and "floyd_blocked" with "dtype" and convert their arrays by "to_lists",
+    the engine 'johnson' runs "johnson" for sparse graphs.
+    """
+
+    if engine == 'numpy':
+        return to_lists(*floyd_numpy(G, dtype))
+    if engine == 'blocked':
+        return to_lists(*floyd_blocked(G, dtype=dtype))
+    if engine == 'johnson':
+        return johnson(G)
+    if engine != 'python':
+        raise ValueError(f"Unknown engine: {engine!r}")
 
     n = len(G.verticies)
     cost_matrix: list[list[int|float]]
-    cost_matrix = deepcopy(G.cost_matrix)
+    if G.storage == 'numpy':    # Python numbers instead of NumPy scalars
+        cost_matrix = G.cost_matrix.tolist()
+    else:
+        cost_matrix = deepcopy(G.cost_matrix)
 
     paths = [[j for j in range(n)] for _ in range(n)]
     
@@ -32,6 +69,539 @@ def floyd(G: Graph) -> tuple[list[list[int|float]], list[list[int]]]:
     return cost_matrix, paths
 
 
+def _check_dtype(dtype: str) -> None:
+
+    if np is None:
+        raise ImportError("The NumPy engines of the Floyd-Warshall algorithm need NumPy")
+    if np.dtype(dtype).kind != 'f':
+        raise ValueError(f"The costs need a float dtype with inf, not {dtype!r}")
+
+
+def _costs(G: Graph, D):
+    """Fills the V×V array "D" with the weights of arrows, 0 and inf elsewhere"""
+
+    if G.storage == 'numpy':    # Masking the cost matrix against the gap
+        M = G.cost_matrix
+        D[:] = np.where(M != G.gap, M, np.inf)
+        np.fill_diagonal(D, 0)
+        return D
+
+    D.fill(np.inf)
+    np.fill_diagonal(D, 0)
+
+    us: list[int] = []
+    vs: list[int] = []
+    ws: list[int|float] = []
+    for u in range(len(D)):
+        for v, w in G.neighbors(u):
+            us.append(u)
+            vs.append(v)
+            ws.append(w)
+    D[us, vs] = ws
+
+    return D
+
+
+def floyd_numpy(G: Graph, dtype: str = 'float64'):
+    """The Floyd-Warshall algorithm on NumPy arrays: (costs, paths) V×V.
+
+    Every step "k" is one vectorized pass: D = minimum(D, D[:, k] + D[k, :])
+    and paths[i, j] = k where the cost is improved, so the results are those
+    of "floyd". Costs are of the float "dtype" ('float32' halves the memory),
+    inf where there is no path, paths are int32. O(V**3) time, O(V**2) memory.
+    """
+
+    _check_dtype(dtype)
+
+    D = _costs(G, np.empty((len(G.verticies),) * 2, dtype=dtype))    # Costs
+    n: int = len(D)
+
+    paths = np.tile(np.arange(n, dtype=np.int32), (n, 1))
+    via = np.empty_like(D)    # Costs of paths through "k"
+    better = np.empty((n, n), dtype=bool)
+
+    for k in range(n):
+        np.add(D[:, k, None], D[None, k, :], out=via)
+        np.less(via, D, out=better)
+        np.copyto(D, via, where=better)
+        paths[better] = k
+
+    return D, paths
+
+
+def _relax_tile(D, paths, rows: tuple[int, int], cols: tuple[int, int], ks: tuple[int, int]) -> None:
+    """D[rows, cols] through the verticies "ks", one vectorized step per vertex"""
+
+    block = D[rows[0]:rows[1], cols[0]:cols[1]]
+    block_paths = paths[rows[0]:rows[1], cols[0]:cols[1]]
+    via = np.empty_like(block)
+    better = np.empty(block.shape, dtype=bool)
+
+    for k in range(*ks):
+        np.add(D[rows[0]:rows[1], k, None], D[None, k, cols[0]:cols[1]], out=via)
+        np.less(via, block, out=better)
+        np.copyto(block, via, where=better)
+        block_paths[better] = k
+
+
+# The shared costs and paths of a worker process of "floyd_blocked"
+_worker_memory: list[SharedMemory] = []
+_worker_arrays: tuple = ()
+
+
+def _init_worker(n: int, dtype: str, costs: str, paths: str) -> None:
+
+    global _worker_memory, _worker_arrays
+    _worker_memory = [SharedMemory(name=costs), SharedMemory(name=paths)]
+    _worker_arrays = (np.ndarray((n, n), dtype=dtype, buffer=_worker_memory[0].buf),
+            np.ndarray((n, n), dtype=np.int32, buffer=_worker_memory[1].buf))
+
+
+def _run_tiles(tiles: list[tuple[tuple[int, int], tuple[int, int], tuple[int, int]]]) -> None:
+
+    for rows, cols, ks in tiles:
+        _relax_tile(*_worker_arrays, rows, cols, ks)
+
+
+def floyd_blocked(G: Graph, tile: int = 256, workers: int | None = None, dtype: str = 'float64'):
+    """The blocked Floyd-Warshall algorithm: (costs, paths) as "floyd_numpy".
+
+    The matrix is split into "tile" × "tile" blocks, a tile of costs and
+    paths should fit the cache. Every phase "b" relaxes through the verticies
+    of the block "b": first the diagonal tile (b, b), then the tiles of the
+    row and the column "b", then all the others. The tiles of each of the last
+    two steps are independent and run by a pool of "workers" processes
+    (os.cpu_count() by default) on the matrices in shared memory.
+    """
+
+    _check_dtype(dtype)
+    n: int = len(G.verticies)
+    workers = workers or os.cpu_count() or 1
+    blocks: list[tuple[int, int]] = [(i, min(i + tile, n)) for i in range(0, n, tile)]
+
+    size: int = n * n * np.dtype(dtype).itemsize
+    memory: list[SharedMemory] = []    # Only the created segments are released
+    D = paths = None
+
+    try:
+        for nbytes in (size, n * n * 4):
+            memory.append(SharedMemory(create=True, size=max(nbytes, 1)))
+
+        D = _costs(G, np.ndarray((n, n), dtype=dtype, buffer=memory[0].buf))
+        paths = np.ndarray((n, n), dtype=np.int32, buffer=memory[1].buf)
+        paths[:] = np.arange(n, dtype=np.int32)
+
+        pool: ProcessPoolExecutor | None = None
+        if workers > 1 and len(blocks) > 1:
+            pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                    initargs=(n, dtype, memory[0].name, memory[1].name))
+
+        try:
+            for b in blocks:
+
+                _relax_tile(D, paths, b, b, b)
+
+                cross = [(b, c, b) for c in blocks if c != b] + [(r, b, b) for r in blocks if r != b]
+                rest = [(r, c, b) for r in blocks if r != b for c in blocks if c != b]
+
+                for tiles in (cross, rest):
+                    if pool is None:
+                        for rows, cols, ks in tiles:
+                            _relax_tile(D, paths, rows, cols, ks)
+                    else:
+                        batches = [tiles[i::workers] for i in range(workers)]
+                        for _ in pool.map(_run_tiles, batches):
+                            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return D.copy(), paths.copy()
+
+    finally:
+        D = paths = None    # The views must be gone before the segments are closed
+        for shm in memory:
+            shm.close()
+            shm.unlink()
+
+
+def _potentials(G: Graph) -> list[int|float]:
+    """Bellman-Ford from a virtual source with 0-arrows to all verticies. O(V * E)
+
+    Raises ValueError if the graph has a negative cycle.
+    """
+
+    n: int = len(G.verticies)
+    arrows: list[tuple[int, int, int|float]] = [(u, v, w) for u in range(n) for v, w in G.neighbors(u)]
+    h: list[int|float] = [0] * n
+
+    for _ in range(n):
+        changed: bool = False
+        for u, v, w in arrows:
+            if h[u] + w < h[v]:
+                h[v] = h[u] + w
+                changed = True
+        if not changed:
+            return h
+
+    raise ValueError("The graph has a negative cycle")
+
+
+class _Reweighted:
+    """The graph "G" with the weights w + h[u] - h[v] for "settle".
+
+    The weights are computed on the fly: a graph can not keep 0-weights.
+    """
+
+    def __init__(self, G: Graph, h: list[int|float]) -> None:
+        self.__G: Graph = G
+        self.__h: list[int|float] = h
+
+        ws: list[int|float] = [w for u in range(len(h)) for _, w in self.neighbors(u)]
+        self.max_int_weight: int | None = None    # As Graph.max_int_weight
+        if all(isinstance(w, Integral) for w in ws):
+            self.max_int_weight = max(ws, default=0)
+
+    def neighbors(self, u: int) -> Iterator[tuple[int, int|float]]:
+
+        h = self.__h
+        for v, w in self.__G.neighbors(u):
+            yield v, max(w + h[u] - h[v], 0)    # Not below 0 by rounding of floats
+
+
+def _johnson_row(G: _Reweighted, h: list[int|float], start: int) -> tuple[list[int|float], list[int]]:
+    """Costs and paths from "start": Dijkstra on the reweighted graph "G"."""
+
+    n: int = len(h)
+    D: CostsType = {}
+    P: dict[int, int] = {}
+    for _ in settle(G, start, D, P):    # type: ignore
+        pass
+
+    costs: list[int|float] = [float('inf')] * n
+    paths: list[int] = list(range(n))
+    for v, cost in D.items():
+        costs[v] = cost - h[start] + h[v]
+        if P[v] not in (-1, start):
+            paths[v] = P[v]
+
+    return costs, paths
+
+
+def _johnson_state(G: Graph, h: list[int|float]) -> tuple[_Reweighted, list[int|float]]:
+    """The state of a worker of "johnson": the reweighted graph and the potentials"""
+    return _Reweighted(G, h), h
+
+
+def _johnson_rows(state: tuple[_Reweighted, list[int|float]], sources: range
+        ) -> list[tuple[list[int|float], list[int]]]:
+
+    R, h = state
+    return [_johnson_row(R, h, start) for start in sources]
+
+
+def johnson(G: Graph, workers: int = 1, batch: int = 16
+        ) -> tuple[list[list[int|float]], list[list[int]]]:
+    """Johnson's algorithm: the cost matrix and the path matrix as "floyd" returns.
+
+    Bellman-Ford potentials "h" make all weights w + h[u] - h[v] non-negative,
+    then Dijkstra runs from every vertex. paths[i][j] is the predecessor of
+    "j" on the shortest path from "i" ("j" itself for the arrow (i, j)), inf
+    and "j" where there is no path. With "workers" > 1 the sources are split
+    into batches run by "run_batches" on the graph mapped from a temporary
+    graph file. Raises ValueError if the graph has a negative cycle.
+    O(V * E + V * (V + E) log V)
+    """
+
+    n: int = len(G.verticies)
+    h: list[int|float] = _potentials(G)
+    rows: list[tuple[list[int|float], list[int]]]
+
+    if workers == 1 or n <= batch:
+        R = _Reweighted(G, h)
+        rows = [_johnson_row(R, h, start) for start in range(n)]
+    else:
+        batches: list[range] = [range(k, min(k + batch, n)) for k in range(0, n, batch)]
+        rows = [row for rows_batch in run_batches(G, _johnson_rows, batches, workers, _johnson_state, h)
+                for row in rows_batch]
+
+    return [costs for costs, _ in rows], [paths for _, paths in rows]
+
+
+def decrease_edge(cost_matrix: list[list[int|float]], paths: list[list[int]],
+        u: int, v: int, w: int|float) -> int:
+    """Repairs "floyd" results in place after the arrow (u, v) got cheaper or was added.
+
+    A pair (i, j) gets the path i -> u -> v -> j if it is cheaper, so "u"
+    (or "v" for i = u) becomes the vertex on the path. For an undirected edge
+    call it for (u, v) and (v, u). Returns the number of improved pairs.
+    Raises ValueError if the arrow makes a negative cycle. O(V**2)
+    """
+
+    if cost_matrix[v][u] + w < 0:
+        raise ValueError(f"The arrow ({u}, {v}) makes a negative cycle")
+
+    n: int = len(cost_matrix)
+    to_u: list[int|float] = [cost_matrix[i][u] for i in range(n)]
+    from_v: list[int|float] = list(cost_matrix[v])
+    improved: int = 0
+
+    for i in range(n):
+
+        through: int|float = to_u[i] + w
+        if through == float('inf'):
+            continue
+
+        row: list[int|float] = cost_matrix[i]
+        row_paths: list[int] = paths[i]
+        k: int = u if i != u else v
+
+        for j in range(n):
+            new_cost = through + from_v[j]
+            if new_cost < row[j]:
+                row[j] = new_cost
+                row_paths[j] = k
+                improved += 1
+
+    return improved
+
+
+def _tight_rows(cost_matrix: list[list[int|float]], u: int, v: int, w: int|float) -> set[int]:
+    """Rows "i" with a shortest path to "v" over the arrow (u, v) of weight "w".
+
+    Float sums depend on the order of additions, so the costs are compared
+    with a relative tolerance: an extra row is only recomputed for nothing.
+    """
+    return {i for i, row in enumerate(cost_matrix)
+            if row[v] != float('inf') and row[u] + w <= row[v] + 1e-9 * max(1, abs(row[v]))}
+
+
+def recompute_rows(G: Graph, cost_matrix: list[list[int|float]], paths: list[list[int]],
+        rows: Iterable[int]) -> None:
+    """Replaces the rows of "floyd" results by Dijkstra on "G" as "johnson" does"""
+
+    h: list[int|float] = _potentials(G)
+    R = _Reweighted(G, h)
+    for i in rows:
+        cost_matrix[i], paths[i] = _johnson_row(R, h, i)
+
+
+def increase_edge(G: Graph, cost_matrix: list[list[int|float]], paths: list[list[int]],
+        u: int, v: int, old: int|float) -> set[int]:
+    """Repairs "floyd" results in place after the arrow (u, v) of the weight "old"
+    got more expensive or was removed, "G" is the changed graph.
+
+    Only the rows with a shortest path over (u, v) change, they are computed
+    again by "recompute_rows". An undirected edge is checked both ways.
+    Returns the recomputed rows. O(V + rows * (V + E) log V)
+    """
+
+    rows: set[int] = _tight_rows(cost_matrix, u, v, old)
+    if isinstance(G, UGraph):
+        rows |= _tight_rows(cost_matrix, v, u, old)
+
+    recompute_rows(G, cost_matrix, paths, rows)
+    return rows
+
+
+class LiveAPSP:
+    """All-pairs shortest paths of the graph kept up to date by its change log.
+
+    "refresh" applies the changes made since the last one: decreases and new
+    edges by "decrease_edge", increases and removals by recomputing only the
+    affected rows, everything by "floyd" if the log does not reach back.
+    """
+
+    def __init__(self, G: Graph, engine: str = 'python') -> None:
+        self.__G: Graph = G
+        self.__engine: str = engine
+
+        self.__cost_matrix: list[list[int|float]]
+        self.__paths: list[list[int]]
+        self.__version: int    # The version of the graph of the results
+        self.__recomputed: int = 0    # Rows recomputed by the last refresh
+
+        self.__rebuild()
+
+    def __rebuild(self) -> None:
+
+        self.__cost_matrix, self.__paths = floyd(self.__G, self.__engine)
+        self.__version = self.__G.version
+        self.__recomputed = len(self.__cost_matrix)
+
+    def refresh(self) -> None:
+        """Brings the results to the current version of the graph"""
+
+        G: Graph = self.__G
+        changes = G.changes(self.__version)
+        if changes is None:
+            return self.__rebuild()
+
+        inf = float('inf')
+        before: dict[tuple[int, int], int|float] = {}    # Arrow: the weight before the changes
+
+        for _, u, v, old, _ in changes:
+            for a, b in ((u, v), (v, u)) if isinstance(G, UGraph) else ((u, v),):
+                before.setdefault((a, b), inf if old == G.gap else old)
+
+        arrows: list[tuple[int, int, int|float]] = []    # Decreased or added arrows
+        rows: set[int] = set()    # Rows to recompute after increases
+
+        for (a, b), old in before.items():
+            new = G.weight(a, b)
+            new = inf if new == G.gap else new
+
+            if new < old:
+                arrows.append((a, b, new))
+            elif new > old:
+                rows |= _tight_rows(self.__cost_matrix, a, b, old)
+
+        # The rows which do not use more expensive arrows stay valid, the
+        # recomputed ones are final, then the decreases are applied on top
+        recompute_rows(G, self.__cost_matrix, self.__paths, rows)
+        for a, b, w in arrows:
+            decrease_edge(self.__cost_matrix, self.__paths, a, b, w)
+
+        self.__version = G.version
+        self.__recomputed = len(rows)
+
+    @property
+    def cost_matrix(self) -> list[list[int|float]]:
+        return self.__cost_matrix
+
+    @property
+    def paths(self) -> list[list[int]]:
+        return self.__paths
+
+    @property
+    def version(self) -> int:
+        """The version of the graph of the results"""
+        return self.__version
+
+    @property
+    def recomputed(self) -> int:
+        """The number of rows recomputed by the last refresh, V for "floyd"."""
+        return self.__recomputed
+
+
+# The APSP table file: costs type ('i' or 'f'), n and the arrays next[V * V] int32, costs[V * V]
+_TABLE_FILE = BinaryFile(b'APSP', 'cxxq', 'an APSP table')
+
+
+class APSPTable:
+    """All-pairs shortest paths as flat V×V arrays of next hops and costs.
+
+    next[i * V + j] is the vertex after "i" on the shortest path to "j", -1 if
+    there is no path. Costs are int32 ('i') or float32 ('f'). The table is
+    saved to a binary file and opened by "load" as memoryviews over the
+    mapped file, so processes serving routes share its pages.
+    """
+
+    def __init__(self, n: int, next_hop: array | memoryview, costs: array | memoryview) -> None:
+        self.__n: int = n    # The number of verticies
+        self.__next: array | memoryview = next_hop
+        self.__costs: array | memoryview = costs
+
+    @classmethod
+    def from_floyd(cls, cost_matrix: list[list[int|float]], paths: list[list[int]],
+            typecode: str | None = None) -> "APSPTable":
+        """The table of "floyd" (or "johnson") results.
+
+        A path from "i" to "j" is the path to paths[i][j] and on to "j", so the
+        next hop to "j" is the next hop to paths[i][j]. The costs are int32 if
+        all of them are integers fitting int32 and float32 otherwise, unless
+        "typecode" ('i' or 'f') is given. O(V**2)
+        """
+
+        if typecode not in (None, 'i', 'f'):
+            raise ValueError(f"Costs must be 'i' or 'f', not {typecode!r}")
+
+        n: int = len(cost_matrix)
+        inf = float('inf')
+        finite: list[int|float] = [c for row in cost_matrix for c in row if c != inf]
+        if typecode is None:
+            fits: bool = all(isinstance(c, Integral) and -2**31 <= c < 2**31 for c in finite)
+            typecode = 'i' if fits else 'f'
+
+        next_hop: array = array('i', [-1]) * (n * n)
+        costs: array = array(typecode, [0]) * (n * n)
+
+        for i in range(n):
+            row: list[int] = [-1] * n    # Next hops from "i"
+            row[i] = i
+
+            for j in range(n):
+                if cost_matrix[i][j] == inf:
+                    continue
+
+                chain: list[int] = []    # Verticies with the same next hop
+                k: int = j
+                while row[k] == -1 and paths[i][k] != k:
+                    chain.append(k)
+                    k = paths[i][k]
+                hop: int = row[k] if row[k] != -1 else k
+                for v in chain:
+                    row[v] = hop
+                row[k] = hop
+
+            next_hop[i * n:(i + 1) * n] = array('i', row)
+            costs[i * n:(i + 1) * n] = array(typecode, [0 if c == inf else c for c in cost_matrix[i]])
+
+        return cls(n, next_hop, costs)
+
+    def cost(self, i: int, j: int) -> int|float:
+        """The cost of the shortest path from "i" to "j", inf if there is no path"""
+
+        if self.__next[i * self.__n + j] == -1:
+            return float('inf')
+        return self.__costs[i * self.__n + j]
+
+    def route(self, i: int, j: int) -> list[int]:
+        """The shortest path from "i" to "j", [] if there is no path. O(path length)"""
+
+        n: int = self.__n
+        if self.__next[i * n + j] == -1:
+            return []
+
+        path: list[int] = [i]
+        while i != j:
+            i = self.__next[i * n + j]
+            path.append(i)
+        return path
+
+    def save(self, path: str) -> None:
+        """Writes the table to the binary file "path" (see "load")"""
+        _TABLE_FILE.write(path, (typecode_of(self.__costs).encode(), self.__n), (self.__next, self.__costs))
+
+    @classmethod
+    def load(cls, path: str) -> "APSPTable":
+        """Opens the table saved by "save", the arrays are read from the mapped file"""
+
+        (_, n), buffers = _TABLE_FILE.map(path, lambda typecode, n: [(n * n, 'i'), (n * n, typecode.decode())])
+        return cls(n, *buffers)
+
+    @property
+    def n_verticies(self) -> int:
+        return self.__n
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the arrays: 8 bytes per pair of verticies"""
+        return self.__next.itemsize * len(self.__next) + self.__costs.itemsize * len(self.__costs)
+
+
+def to_lists(costs, paths) -> tuple[list[list[int|float]], list[list[int]]]:
+    """Converts arrays of "floyd_numpy" to the lists of lists of "floyd".
+
+    Integral costs are converted to int, as the integer weights of the graph.
+    """
+
+    cost_matrix: list[list[int|float]] = [
+            [int(c) if c.is_integer() else c for c in row] for row in costs.tolist()
+        ]
+    return cost_matrix, paths.tolist()
+
+
 if __name__ == '__main__':
 
     txt = "the Floyd–Warshall algorithm (also known as Floyd's algorithm, the Roy–Warshall algorithm, the Roy–Floyd algorithm, or the WFI algorithm) is an algorithm for finding shortest paths in a directed weighted graph with positive or negative edge weights (but with no negative cycles)."
@@ -57,19 +627,129 @@ if __name__ == '__main__':
     for line in cost_matrix:
         print(line)
         
-    def get_path(paths, start, end):
-
-        path = [end]
-        v = end
-        
-        while  v != start:
-            v = paths[v][start]
-            path.append(v)
-        
-        path.reverse()
-        
-        return path
-
+    table = APSPTable.from_floyd(cost_matrix, paths)
     start = 4
     end = 0
-    path = get_path(paths, start, end)
+    path = table.route(start, end)
+    assert path == [4, 3, 2, 0] and table.cost(start, end) == 9, "Something wrong with the route"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table_path = os.path.join(tmp, 'apsp.bin')
+        table.save(table_path)
+        loaded = APSPTable.load(table_path)
+        assert all(loaded.route(i, j) == table.route(i, j) and loaded.cost(i, j) == cost_matrix[i][j]
+                for i in range(5) for j in range(5)), "Something wrong with the loaded table"
+
+    assert APSPTable.from_floyd(cost_matrix, paths, typecode='f').cost(0, 4) == 9.0, "Something wrong with float32 costs"
+
+    try:
+        APSPTable.from_floyd(cost_matrix, paths, typecode='d')
+    except ValueError:
+        pass
+    else:
+        assert False, "The costs of a table are not 4 bytes"
+
+    # Johnson's algorithm on the directed graph with negative arrows
+    D = DGraph(4, gap=float('inf'), weighted=True)
+    D.add_arrow(0, 1, 4)
+    D.add_arrow(0, 2, 1)
+    D.add_arrow(2, 1, -2)
+    D.add_arrow(1, 3, 1)
+    D.add_arrow(3, 0, 3)
+
+    for workers in (1, 2):
+        costs, johnson_paths = johnson(D, workers=workers, batch=1)
+        assert costs == floyd(D)[0], "Something wrong with Johnson's algorithm"
+        assert APSPTable.from_floyd(costs, johnson_paths).route(0, 3) == [0, 2, 1, 3], "Something wrong with the route of Johnson's results"
+        assert johnson_paths[0][3] == 1 and johnson_paths[0][1] == 2 and johnson_paths[0][2] == 2, "Something wrong with paths of Johnson's algorithm"
+    assert floyd(G, engine='johnson')[0] == cost_matrix, "Something wrong with the Johnson's engine"
+
+    D.add_arrow(3, 0, -1)    # 0 -> 2 -> 1 -> 3 -> 0 costs -3
+    try:
+        johnson(D)
+        assert False, "The negative cycle is not found"
+    except ValueError:
+        pass
+
+    # Keeping the results up to date
+    L = UGraph.from_edges(5, G.edge_list, gap=float('inf'), weighted=True)
+    live = LiveAPSP(L)
+    L.add_edge(1, 2, 1)
+    L.update_weight(3, 4, 2)
+    live.refresh()
+    assert live.cost_matrix == floyd(L)[0] and live.recomputed == 0, "Something wrong with decreases"
+
+    L.update_weight(1, 4, 12)    # Not on any shortest path
+    live.refresh()
+    assert live.cost_matrix == floyd(L)[0] and live.recomputed == 0, "Something wrong with an unused edge"
+
+    L.update_weight(3, 1, 7)
+    L.update_weight(3, 1, 8)
+    L.remove_edge(0, 2)
+    live.refresh()
+    assert live.cost_matrix == floyd(L)[0], "Something wrong with increases"
+
+    F = UGraph(5, gap=float('inf'), weighted=True)    # 0.1 + 0.2 != 0.3 in floats
+    for u, v, w in ((0, 1, 0.3), (0, 2, 0.2), (0, 4, 0.7), (1, 3, 0.1), (2, 3, 0.7), (3, 4, 0.2)):
+        F.add_edge(u, v, w)
+    live_floats = LiveAPSP(F)
+    F.update_weight(0, 2, 9.0)
+    live_floats.refresh()
+    assert all(math.isclose(a, b) for row, expected in zip(live_floats.cost_matrix, floyd(F)[0])
+               for a, b in zip(row, expected)), "Something wrong with increases of float weights"
+
+    costs, live_paths = floyd(L)
+    decrease_edge(costs, live_paths, 4, 0, 1)    # Only the arrow 4 -> 0 in the undirected graph
+    assert costs[4] == [1, 5, 4, 2, 0] and costs[0][4] == 8 and live_paths[4][0] == 0, "Something wrong with decreasing an arrow"
+
+    if np is not None:
+        import random
+        import time
+
+        for dtype in ('float64', 'float32'):
+            assert floyd(G, engine='numpy', dtype=dtype) == (cost_matrix, paths), f"Something wrong with the NumPy engine of {dtype}"
+
+        for gap, dtype in ((float('inf'), 'float64'), (-1, 'int32')):    # The NumPy storage
+            N = UGraph.from_edges(5, G.edge_list, gap=gap, weighted=True, storage='numpy', dtype=dtype)
+            assert to_lists(*floyd_numpy(N)) == (cost_matrix, paths), f"Something wrong with the NumPy storage of {dtype}"
+        N = UGraph.from_edges(5, G.edge_list, gap=float('inf'), weighted=True, storage='numpy')
+        assert floyd(N) == (cost_matrix, paths) and type(floyd(N)[0]) is list, "Something wrong with the lists of the NumPy storage"
+
+        n = 120
+        random.seed(16)
+        R = UGraph(n, gap=float('inf'), weighted=True)
+        for _ in range(4 * n):
+            u, v = random.sample(range(n), 2)
+            R.add_edge(u, v, random.randint(1, 20))
+
+        started = time.perf_counter()
+        expected = floyd(R)
+        python_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        assert floyd(R, engine='numpy') == expected, "Something wrong with the NumPy engine"
+        print(f"V = {n}: python {python_time:.3f} s, numpy {time.perf_counter() - started:.3f} s")
+
+        # Johnson's algorithm on the sparse graph with negative arrows and without negative cycles
+        p = [random.randint(0, 10) for _ in range(n)]
+        S = DGraph(n, gap=float('inf'), weighted=True)
+        for _ in range(3 * n):
+            u, v = random.sample(range(n), 2)
+            S.add_arrow(u, v, random.randint(1, 20) + p[u] - p[v] or 21)
+
+        started = time.perf_counter()
+        expected = floyd(S)
+        python_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        assert floyd(S, engine='johnson')[0] == expected[0], "Something wrong with Johnson's algorithm on the sparse graph"
+        print(f"E = 3V: python {python_time:.3f} s, johnson {time.perf_counter() - started:.3f} s")
+
+        costs, _ = floyd_numpy(R)
+        for tile, workers in ((16, 1), (32, 2), (n, 1)):
+            blocked_costs, blocked_paths = floyd_blocked(R, tile=tile, workers=workers)
+            assert (blocked_costs == costs).all(), "Something wrong with the blocked engine"
+
+            for i, j in ((0, n - 1), (5, 77), (n - 1, 3)):
+                k = int(blocked_paths[i, j])
+                assert k == j or costs[i, k] + costs[k, j] == costs[i, j], "Something wrong with paths of the blocked engine"
@@ -5,8 +5,8 @@
 Задача: Найти максисальный поток из источника s в t.
 """
 
-from graphs import FGraph, FlowType, MatrixFlowType
-from copy import deepcopy
+from graphs import FGraph
+from array import array
 
 
 class FordFulk:
@@ -17,33 +17,32 @@ class FordFulk:
 
     def __init__(self, G: FGraph) -> None:
         self.__n_verticies: int = len(G.verticies)    # The number of verticies
-        self.__matrix: MatrixFlowType = deepcopy(G.cost_matrix)    # The cost matrix
+        self.__G: FGraph = G
+        self.__flow: array = G.snapshot()    # Own flows, the arcs of G are shared
 
-    def __get_max_vertex(self, u: int, V: set) -> int:
-        """Get max neighbor of the current vertice"""
+    def __get_max_vertex(self, u: int, V: set) -> tuple[int, int]:
+        """Get max neighbor of the current vertice and the arc to it"""
         
         mx_weight: int | float = 0
         mx_vertex: int = -1
+        mx_arc: int = -1
 
-        for v in range(self.__n_verticies):
+        head, capacity = self.__G.head, self.__G.capacity
+
+        for a in self.__G.arcs(u):
             
+            v: int = head[a]
             if v in V:
                 continue
             
-            arc: FlowType = self.__matrix[u][v]
-            
-            if arc[2] == 1:
+            residual: int | float = capacity[a] - self.__flow[a]
             
-                if arc[0] > mx_weight:
-                    mx_weight = arc[0]
-                    mx_vertex = v
-            else:
-                
-                if arc[1] > mx_weight:
-                    mx_weight = arc[1]
-                    mx_vertex = v
+            if residual > mx_weight:
+                mx_weight = residual
+                mx_vertex = v
+                mx_arc = a
             
-        return mx_vertex
+        return mx_vertex, mx_arc
 
     def __get_max_flow(self, arrows: list[tuple[int | float, int, int]]
                        ) -> int | float:
@@ -59,14 +58,10 @@ class FordFulk:
             if arrow[1] == -1:    # The initial vertice
                 continue
             
-            _, u, v = arrow     # Arrow: weight, from, to
-            sgn = self.__matrix[u][v][2]    # The sign of the flow
-            
-            self.__matrix[u][v][0] -= f*sgn
-            self.__matrix[u][v][1] += f*sgn
+            _, _, a = arrow     # Arrow: residual, from, arc
             
-            self.__matrix[v][u][0] -= f*sgn
-            self.__matrix[v][u][1] += f*sgn
+            self.__flow[a] += f
+            self.__flow[a ^ 1] -= f
             
     def run(self, start: int, end: int) -> float | int:
         
@@ -76,13 +71,13 @@ class FordFulk:
         while v != -1:
             
             u: int = start
-            S: list[tuple[int | float, int, int]]    # Arrows: weight, from, to
+            S: list[tuple[int | float, int, int]]    # Arrows: residual, from, arc
             S = [(float("inf"), -1, u)]
             V: set[int] = {u}    # Visited verticies
             
             while u != end:
 
-                v = self.__get_max_vertex(u, V)
+                v, a = self.__get_max_vertex(u, V)
 
                 if v == -1:
                     if u == start:
@@ -91,15 +86,9 @@ class FordFulk:
                         u = S.pop()[1]
                         continue
 
-                direction: int | float
-                direction = self.__matrix[u][v][2]
+                w = self.__G.capacity[a] - self.__flow[a]
 
-                if direction == 1:
-                    w = self.__matrix[u][v][0]
-                else:
-                    w = self.__matrix[u][v][1]
-
-                S.append((w, u, v))
+                S.append((w, u, a))
                 V.add(v)
 
                 if v == end:
@@ -113,6 +102,466 @@ class FordFulk:
 
         return sum(F)
 
+    @property
+    def flow(self) -> array:
+        """Flows of arcs after "run", indexed as the arcs of the graph"""
+        return self.__flow
+
+
+def _arc_arrays(G: FGraph) -> tuple[array, array]:
+    """Arcs grouped by their tails: the arcs leaving "u" are arcs[offsets[u]:offsets[u + 1]]"""
+
+    offsets: array = array('q', [0])
+    arcs: array = array('q')
+    for u in G.verticies:
+        arcs.extend(G.arcs(u))
+        offsets.append(len(arcs))
+
+    return offsets, arcs
+
+
+class Dinic:
+    """Dinic's algorithm: blocking flows in the level graphs of BFS.
+
+    The arcs of "G" are grouped by their tails into arrays (offsets, arcs),
+    the current arc of every vertex only moves forward within a phase, so a
+    blocking flow costs O(V * E) and there are at most V phases. O(V**2 * E)
+    "run" augments the flows it starts from: a snapshot of "G" or "flow",
+    which is changed in place then.
+    """
+
+    def __init__(self, G: FGraph, flow: array | None = None) -> None:
+        self.__n_verticies: int = len(G.verticies)    # The number of verticies
+        self.__G: FGraph = G
+        self.__flow: array = G.snapshot() if flow is None else flow    # Own flows, the arcs of G are shared
+
+        self.__offsets: array
+        self.__arcs: array
+        self.__offsets, self.__arcs = _arc_arrays(G)
+
+        self.__level: array = array('q')    # BFS levels, -1 for unreachable verticies
+        self.__phases: int = 0    # Phases of the last run
+
+    def __bfs(self, start: int, end: int) -> bool:
+        """Levels of the residual graph from "start", True if "end" is reached"""
+
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+        offsets, arcs = self.__offsets, self.__arcs
+
+        level: array = array('q', [-1]) * self.__n_verticies
+        level[start] = 0
+        queue: list[int] = [start]
+
+        for u in queue:
+            for i in range(offsets[u], offsets[u + 1]):
+                a = arcs[i]
+                v = head[a]
+                if level[v] == -1 and capacity[a] > flow[a]:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+
+        self.__level = level
+        return level[end] != -1
+
+    def __blocking_flow(self, start: int, end: int) -> int | float:
+        """Saturates paths of the level graph by DFS from the current arcs"""
+
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+        offsets, arcs, level = self.__offsets, self.__arcs, self.__level
+
+        current: array = array('q', offsets[:-1])    # The current arc of every vertex
+        path: list[int] = []    # Arcs from "start" to "u"
+        total: int | float = 0
+        u: int = start
+
+        while True:
+
+            if u == end:
+                f = min(capacity[a] - flow[a] for a in path)
+                total += f
+
+                cut: int = len(path)    # The first saturated arc
+                for i, a in enumerate(path):
+                    flow[a] += f
+                    flow[a ^ 1] -= f
+                    if cut == len(path) and capacity[a] == flow[a]:
+                        cut = i
+
+                del path[cut:]
+                u = head[path[-1]] if path else start
+                continue
+
+            i: int = current[u]
+            while i < offsets[u + 1]:
+                a = arcs[i]
+                if capacity[a] > flow[a] and level[head[a]] == level[u] + 1:
+                    break
+                i += 1
+            current[u] = i
+
+            if i < offsets[u + 1]:    # Advance
+                path.append(arcs[i])
+                u = head[arcs[i]]
+                continue
+
+            if u == start:
+                return total
+
+            level[u] = -1    # A dead end, retreat
+            u = head[path.pop() ^ 1]
+            current[u] += 1
+
+    def run(self, start: int, end: int) -> float | int:
+
+        total: int | float = 0
+        self.__phases = 0
+
+        if start == end:
+            return 0
+
+        while self.__bfs(start, end):
+            total += self.__blocking_flow(start, end)
+            self.__phases += 1
+
+        return total
+
+    @property
+    def flow(self) -> array:
+        """Flows of arcs after "run", indexed as the arcs of the graph"""
+        return self.__flow
+
+    @property
+    def phases(self) -> int:
+        """The number of blocking flows of the last run"""
+        return self.__phases
+
+
+class PushRelabel:
+    """The push-relabel algorithm with the highest-label selection.
+
+    Active verticies (with an excess) are kept in buckets by their heights and
+    the highest one is discharged first. The gap heuristic lifts the verticies
+    above an emptied height out of reach of the sink, the global relabeling
+    sets the heights to the distances to the sink by BFS on reverse residual
+    arcs at the start and after every "global_relabel" * V relabels. Only the
+    first phase runs: "flow" is a maximum preflow, the excess which can not
+    reach the sink is not returned to the source. O(V**2 * sqrt(E))
+    """
+
+    def __init__(self, G: FGraph, global_relabel: float = 1.0) -> None:
+        self.__n_verticies: int = len(G.verticies)    # The number of verticies
+        self.__G: FGraph = G
+        self.__flow: array = G.snapshot()    # Own flows, the arcs of G are shared
+        self.__global_relabel: float = global_relabel
+
+        self.__offsets: array
+        self.__arcs: array
+        self.__offsets, self.__arcs = _arc_arrays(G)
+
+        self.__height: array = array('q')
+        self.__excess: array = array(self.__flow.typecode)
+        self.__count: array = array('q')    # The number of verticies of every height below V
+        self.__current: array = array('q', self.__offsets[:-1])    # The current arc of every vertex
+        self.__buckets: list[list[int]] = []    # Active verticies by heights
+        self.__top: int = -1    # The highest non-empty bucket at most
+
+        self.__pushes: int = 0
+        self.__relabels: int = 0
+        self.__global_relabels: int = 0
+        self.__gaps: int = 0
+
+    def __relabel_all(self, start: int, end: int) -> None:
+        """Global relabeling: heights are BFS distances to "end", V if it is unreachable"""
+
+        n: int = self.__n_verticies
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+        offsets, arcs = self.__offsets, self.__arcs
+
+        height: array = array('q', [n]) * n
+        height[end] = 0
+        queue: list[int] = [end]
+
+        for v in queue:
+            for i in range(offsets[v], offsets[v + 1]):
+                a = arcs[i]
+                u = head[a]
+                if height[u] == n and u != start and capacity[a ^ 1] > flow[a ^ 1]:
+                    height[u] = height[v] + 1
+                    queue.append(u)
+
+        height[start] = n
+        self.__height = height
+        self.__current = array('q', offsets[:-1])    # Heights may be lower now
+        self.__global_relabels += 1
+
+        self.__count = array('q', bytes(8 * n))
+        self.__buckets = [[] for _ in range(n)]
+        self.__top = -1
+        for u in range(n):
+            if height[u] < n:
+                self.__count[height[u]] += 1
+                if self.__excess[u] > 0 and u != end:
+                    self.__buckets[height[u]].append(u)
+                    self.__top = max(self.__top, height[u])
+
+    def __gap(self, h: int) -> None:
+        """No verticies of the height "h" are left: the higher ones can not reach the sink"""
+
+        n: int = self.__n_verticies
+        height, count = self.__height, self.__count
+
+        for u in range(n):
+            if h < height[u] < n:
+                count[height[u]] -= 1
+                height[u] = n
+        self.__gaps += 1
+
+    def __discharge(self, u: int, end: int) -> None:
+        """Pushes the excess of "u" along admissible arcs, relabels "u" when there are none"""
+
+        n: int = self.__n_verticies
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+        offsets, arcs = self.__offsets, self.__arcs
+        height, excess, count, current = self.__height, self.__excess, self.__count, self.__current
+
+        while excess[u] > 0:
+
+            for i in range(current[u], offsets[u + 1]):
+                a = arcs[i]
+                v = head[a]
+                residual = capacity[a] - flow[a]
+
+                if residual > 0 and height[u] == height[v] + 1:
+                    f = min(excess[u], residual)
+                    flow[a] += f
+                    flow[a ^ 1] -= f
+                    excess[u] -= f
+                    self.__pushes += 1
+
+                    if excess[v] == 0 and v != end:    # "u" may be relabeled above the top
+                        self.__buckets[height[v]].append(v)
+                        self.__top = max(self.__top, height[v])
+                    excess[v] += f
+
+                    if excess[u] == 0:
+                        current[u] = i
+                        return
+
+            # Relabel: one above the lowest residual neighbor
+            old: int = height[u]
+            new: int = min((height[head[arcs[i]]] for i in range(offsets[u], offsets[u + 1])
+                    if capacity[arcs[i]] > flow[arcs[i]]), default=n - 1) + 1
+            self.__relabels += 1
+
+            count[old] -= 1
+            current[u] = offsets[u]
+            height[u] = min(new, n)
+            if count[old] == 0:
+                height[u] = n
+                self.__gap(old)
+            if height[u] >= n:
+                return
+            count[height[u]] += 1
+
+    def run(self, start: int, end: int) -> float | int:
+
+        n: int = self.__n_verticies
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+        offsets, arcs = self.__offsets, self.__arcs
+
+        self.__pushes = self.__relabels = self.__global_relabels = self.__gaps = 0
+        self.__excess = array(flow.typecode, bytes(8 * n))
+        excess = self.__excess
+
+        if start == end:
+            return 0
+
+        for i in range(offsets[start], offsets[start + 1]):    # Saturate the arcs of the source
+            a = arcs[i]
+            f = capacity[a] - flow[a]
+            if f > 0:
+                flow[a] += f
+                flow[a ^ 1] -= f
+                excess[head[a]] += f
+                excess[start] -= f
+                self.__pushes += 1
+
+        self.__relabel_all(start, end)
+        relabels: int = 0    # Relabels at the last global relabeling
+
+        while self.__top >= 0:
+
+            bucket: list[int] = self.__buckets[self.__top]
+            if not bucket:
+                self.__top -= 1
+                continue
+
+            u: int = bucket.pop()
+            if self.__height[u] != self.__top or excess[u] == 0:    # A stale entry
+                continue
+
+            self.__discharge(u, end)    # "u" is done or out of reach of the sink
+
+            if self.__global_relabel and self.__relabels - relabels > self.__global_relabel * n:
+                relabels = self.__relabels
+                self.__relabel_all(start, end)
+
+        return excess[end]
+
+    @property
+    def flow(self) -> array:
+        """The maximum preflow after "run", indexed as the arcs of the graph"""
+        return self.__flow
+
+    @property
+    def pushes(self) -> int:
+        return self.__pushes
+
+    @property
+    def relabels(self) -> int:
+        return self.__relabels
+
+    @property
+    def global_relabels(self) -> int:
+        return self.__global_relabels
+
+    @property
+    def gaps(self) -> int:
+        """The number of times the gap heuristic fired in the last run"""
+        return self.__gaps
+
+
+class MaxFlow:
+    """The maximum flow from "start" to "end" kept up to date under capacity changes.
+
+    The flows and the residual graph stay between changes: an increased
+    capacity only needs more augmenting paths (Dinic's algorithm from the
+    current flows). When a capacity drops below the flow of its arc, the
+    excess is rerouted around the arc if possible and canceled otherwise,
+    back to the source from the tail and back from the sink to the head.
+    """
+
+    def __init__(self, G: FGraph, start: int, end: int) -> None:
+        self.__G: FGraph = G
+        self.__start: int = start
+        self.__end: int = end
+
+        self.__flow: array = G.snapshot()    # Own flows, the arcs of G are shared
+        self.__dinic: Dinic = Dinic(G, self.__flow)
+        self.__value: int | float = 0
+
+        self.__augment_all()
+
+    def __augment_all(self) -> None:
+        self.__dinic.run(self.__start, self.__end)
+        self.__value = sum(self.__flow[a] for a in self.__G.arcs(self.__start))
+
+    def __augment(self, source: int, target: int, limit: int | float) -> int | float:
+        """Pushes up to "limit" from "source" to "target" by BFS augmenting paths"""
+
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+        pushed: int | float = 0
+
+        while pushed < limit and source != target:
+
+            parent: dict[int, int] = {source: -1}    # Vertex: the arc to it
+            queue: list[int] = [source]
+            for u in queue:
+                for a in self.__G.arcs(u):
+                    v = head[a]
+                    if v not in parent and capacity[a] > flow[a]:
+                        parent[v] = a
+                        queue.append(v)
+                if target in parent:
+                    break
+
+            if target not in parent:
+                break
+
+            path: list[int] = []
+            v = target
+            while v != source:
+                path.append(parent[v])
+                v = head[parent[v] ^ 1]
+
+            f = min(limit - pushed, *(capacity[a] - flow[a] for a in path))
+            for a in path:
+                flow[a] += f
+                flow[a ^ 1] -= f
+            pushed += f
+
+        return pushed
+
+    def set_capacity(self, a: int, c: int | float) -> int | float:
+        """Changes the capacity of the arc "a" (even) of the graph, returns the new maximum flow"""
+
+        self.__G.set_capacity(a, c)
+        if self.__G.capacity.typecode != self.__flow.typecode:    # Capacities became floats
+            self.__flow = array(self.__G.capacity.typecode, self.__flow)
+            self.__dinic = Dinic(self.__G, self.__flow)
+
+        flow = self.__flow
+        excess: int | float = flow[a] - c
+        if excess > 0:
+
+            u: int = self.__G.head[a ^ 1]    # The tail of the arc
+            v: int = self.__G.head[a]
+            flow[a] = c
+            flow[a ^ 1] = -c
+
+            # "u" has "excess" too much and "v" too little: reroute, then cancel the rest
+            rest: int | float = excess - self.__augment(u, v, excess)
+            if rest > 0:
+                if u != self.__start:
+                    self.__augment(u, self.__start, rest)
+                if v != self.__end:
+                    self.__augment(self.__end, v, rest)
+
+        self.__augment_all()
+        return self.__value
+
+    def min_cut(self) -> tuple[set[int], list[int]]:
+        """The minimum cut: verticies reachable from "start" in the residual graph
+        and the arcs leaving them, their capacities sum up to the flow. O(V + E)
+        """
+
+        head, capacity, flow = self.__G.head, self.__G.capacity, self.__flow
+
+        source_side: set[int] = {self.__start}
+        queue: list[int] = [self.__start]
+        for u in queue:
+            for a in self.__G.arcs(u):
+                v = head[a]
+                if v not in source_side and capacity[a] > flow[a]:
+                    source_side.add(v)
+                    queue.append(v)
+
+        arcs: list[int] = [a for u in source_side for a in self.__G.arcs(u)
+                if a % 2 == 0 and head[a] not in source_side]
+        return source_side, arcs
+
+    @property
+    def value(self) -> int | float:
+        """The current maximum flow"""
+        return self.__value
+
+    @property
+    def flow(self) -> array:
+        """Flows of arcs, indexed as the arcs of the graph"""
+        return self.__flow
+
+
+METHODS: dict[str, type] = {'ford_fulkerson': FordFulk, 'dinic': Dinic,
+        'push_relabel': PushRelabel}    # Engines of "max_flow"
+
+
+def max_flow(G: FGraph, start: int, end: int, method: str = 'dinic') -> float | int:
+    """The maximum flow from "start" to "end" by one of METHODS, "G" is not changed"""
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method!r}")
+    return METHODS[method](G).run(start, end)
+
 
 if __name__ == "__main__":
     
@@ -127,9 +576,70 @@ if __name__ == "__main__":
     fgraph.add_arrow(3, 4, [20, 0, 1])
 
     ff: FordFulk = FordFulk(fgraph)
-    max_flow: float | int = ff.run(0, 4)
+    flow_value: float | int = ff.run(0, 4)
 
     expected_flow = 60
-    assert max_flow == expected_flow, "Wrong flow"
+    assert flow_value == expected_flow, "Wrong flow"
+
+    print("Maximum flow is", flow_value)
+
+    # Repeated runs share the arcs of the graph, the graph itself is not changed
+    assert FordFulk(fgraph).run(0, 4) == expected_flow, "Wrong flow on the second run"
+    assert not any(fgraph.flow), "The flow graph is changed by the run"
+
+    fgraph.add_arrow(3, 1, [15, 0, 1])
+    fgraph.add_arrow(0, 3, [10, 0, 1])    # A parallel arrow
+    assert FordFulk(fgraph).run(0, 4) == 70, "Wrong flow with parallel arrows"
+    assert max_flow(fgraph, 0, 4) == max_flow(fgraph, 0, 4, method='ford_fulkerson') == 70, "Wrong flow of Dinic's algorithm"
+
+    dinic = Dinic(fgraph)
+    assert dinic.run(2, 2) == 0 and dinic.phases == 0, "Wrong flow from a vertex to itself"
+    dinic.run(0, 4)
+    for u in range(1, 4):    # The flow is conserved
+        assert sum(dinic.flow[a] for a in fgraph.arcs(u)) == 0, "The flow of Dinic's algorithm is not conserved"
+
+    # The layered network "layers" × "width" with random capacities
+    import random
+    import time
+
+    random.seed(21)
+    layers, width = 40, 50
+    n = layers * width + 2
+    network = FGraph(n)
+    for x in range(width):
+        network.add_arrow(0, 1 + x, [random.randint(50, 100), 0, 1])
+        network.add_arrow(n - 1 - width + x, n - 1, [random.randint(50, 100), 0, 1])
+    for layer in range(layers - 1):
+        for x in range(width):
+            for y in random.sample(range(width), 3):
+                network.add_arrow(1 + layer * width + x, 1 + (layer + 1) * width + y, [random.randint(1, 40), 0, 1])
+
+    results = {}
+    for method in METHODS:
+        started = time.perf_counter()
+        results[method] = max_flow(network, 0, n - 1, method)
+        print(f"{method}: flow {results[method]}, {time.perf_counter() - started:.3f} s")
+    assert len(set(results.values())) == 1, "The methods disagree"
+
+    for frequency in (0, 0.5, 2):
+        push_relabel = PushRelabel(network, global_relabel=frequency)
+        assert push_relabel.run(0, n - 1) == results['dinic'], "Wrong flow of push-relabel"
+        print(f"Global relabel every {frequency} V relabels: {push_relabel.pushes} pushes, {push_relabel.relabels} relabels, "
+                f"{push_relabel.global_relabels} global relabels, {push_relabel.gaps} gaps")
+
+    # Capacity changes with a warm start
+    live = MaxFlow(network, 0, n - 1)
+    assert live.value == results['dinic'], "Wrong flow of the warm start"
+
+    source_side, cut = live.min_cut()
+    assert 0 in source_side and n - 1 not in source_side, "Wrong sides of the minimum cut"
+    assert sum(network.capacity[a] for a in cut) == live.value, "Wrong capacity of the minimum cut"
+
+    for a in random.sample(range(0, 2 * network.n_arrows, 2), 30):
+        c = random.choice([0, network.capacity[a] // 2, network.capacity[a] * 2, 200])
+        value = live.set_capacity(a, c)
+        assert value == Dinic(network).run(0, n - 1), "Wrong flow after a capacity change"
+        assert all(-network.capacity[b ^ 1] <= live.flow[b] <= network.capacity[b] for b in range(len(live.flow))), "The flow exceeds a capacity"
+        assert all(sum(live.flow[b] for b in network.arcs(u)) == 0 for u in range(1, n - 1)), "The flow is not conserved"
 
-    print("Maximum flow is", max_flow)
+    assert sum(network.capacity[a] for a in live.min_cut()[1]) == live.value, "Wrong capacity of the minimum cut"
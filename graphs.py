@@ -1,163 +1,1446 @@
-from typing import Iterable
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+from itertools import repeat
+import mmap
+from numbers import Integral
+import os
+import struct
+import sys
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:    # NumPy is needed only for storage='numpy'
+    np = None
 
 MatrixType = list[list[int | float]]    # The cost matrix oft the directed or undirected graph
 FlowType = list[float | int]        
 MatrixFlowType = list[list[FlowType]]    # The cost matrix of the graph with a flow
 EdgeType = tuple[int | float, int, int] | tuple[int, int]    # Types of edges/arrows of graphs: directed, undirected or graphs with a flow
+ChangeType = tuple[int, int, int, int | float, int | float]    # A change of a graph: version, u, v, old weight, new weight
+
+def _as_array(values: Iterable, typecode: str) -> array:
+    """Converts a sequence to an array of "typecode" ('q' or 'd').
+
+    A one-dimensional buffer of the same item type (an array, a NumPy array)
+    is copied as raw bytes without a Python-level loop.
+    """
+
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+
+    try:
+        view = memoryview(values)    # type: ignore
+    except TypeError:
+        return array(typecode, values)
+
+    fmt: str = view.format.lstrip('@=<')
+    same_type: bool = fmt in ('q', 'l', 'n') if typecode == 'q' else fmt == 'd'
+
+    out: array = array(typecode)
+    if view.ndim == 1 and view.c_contiguous and same_type and view.itemsize == out.itemsize:
+        out.frombytes(view.cast('B'))
+    else:
+        out.fromlist(view.tolist())
+    return out
+
+
+def as_weights(values: Iterable) -> array:
+    """Converts weights to an array of integers or, if it fails, doubles"""
+
+    try:
+        return _as_array(values, 'q')
+    except TypeError:
+        return _as_array(values, 'd')
+
+
+def _edge_arrays(edges: Iterable[EdgeType]) -> tuple[array, array, array | None]:
+    """Splits edges (w, u, v) or (u, v) into parallel arrays us, vs, ws"""
+
+    us: array = array('q')
+    vs: array = array('q')
+    ws: list[int|float] = []
+
+    for edge in edges:
+        if len(edge) == 3:
+            w, u, v = edge
+            ws.append(w)
+        else:
+            u, v = edge    # type: ignore
+        us.append(u)
+        vs.append(v)
+
+    if ws and len(ws) != len(us):
+        raise ValueError("Edges must all be (w, u, v) or all be (u, v)")
+
+    return us, vs, (as_weights(ws) if ws else None)
+
+
+def check_arrays(n: int, us: array, vs: array, ws: array | None) -> None:
+    """Checks the lengths of parallel arrays and the bounds of verticies in bulk"""
+
+    if len(us) != len(vs) or (ws is not None and len(ws) != len(us)):
+        raise ValueError("Arrays of verticies and weights must have the same length")
+
+    if us and (min(us) < 0 or min(vs) < 0 or max(us) >= n or max(vs) >= n):
+        raise IndexError(f"Vertex out of range 0..{n - 1}")
+
+
+def typecode_of(buf: array | memoryview) -> str:
+    """The typecode of an array or the format of a memoryview"""
+    return buf.typecode if isinstance(buf, array) else buf.format
+
+
+class BinaryFile:
+    """A binary file of a header and fixed-width little-endian arrays.
+
+    The header is packed by "struct" as the magic and the version followed by
+    "fields", the arrays follow it without gaps. "map" opens the arrays as
+    read-only views of the mapped pages, nothing is copied on a little-endian
+    machine and processes share the pages. "name" is for error messages.
+    """
+
+    def __init__(self, magic: bytes, fields: str, name: str, version: int = 1) -> None:
+        self.__magic: bytes = magic
+        self.__version: int = version
+        self.__name: str = name
+        self.__header = struct.Struct('<4sB' + fields)
+
+    def pack(self, *fields) -> bytes:
+        """The header with "fields" after the magic and the version"""
+        return self.__header.pack(self.__magic, self.__version, *fields)
+
+    def write(self, path: str, fields: tuple, arrays: Iterable[array | memoryview]) -> None:
+        """Writes the header with "fields" and the arrays to the file "path"."""
+
+        with open(path, 'wb') as f:
+            f.write(self.pack(*fields))
+
+            for buf in arrays:
+                if sys.byteorder == 'big':
+                    buf = array(typecode_of(buf), buf)
+                    buf.byteswap()
+                f.write(buf)
+
+    def map(self, path: str, layout: Callable[..., Iterable[tuple[int, str]]]
+            ) -> tuple[tuple, list[memoryview | array]]:
+        """Maps the file "path" to memory, returns the fields of the header and the arrays.
+
+        layout(*fields) gives the (length, typecode) of every array in the file.
+        """
+
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, *fields = self.__header.unpack_from(mm)
+        if magic != self.__magic or version != self.__version:
+            raise ValueError(f"{path} is not {self.__name} file")
+
+        buffers: list[memoryview | array] = []
+        start: int = self.__header.size
+        for length, typecode in layout(*fields):
+            size: int = length * array(typecode).itemsize
+            buf: memoryview | array = memoryview(mm)[start:start + size].cast(typecode)
+            if sys.byteorder == 'big':
+                buf = array(typecode, buf.tobytes())
+                buf.byteswap()
+            buffers.append(buf)
+            start += size
+
+        return tuple(fields), buffers
+
+    @property
+    def header_size(self) -> int:
+        return self.__header.size
+
+
+# The binary graph file: kind, weighted, weight type, n, nnz, gap and the arrays
+#   offsets[n + 1] ('q'), targets[nnz] ('q'), weights[nnz] ('q' or 'd')
+# and for a flow graph flows[nnz] of the same type as weights (capacities).
+_GRAPH_FILE = BinaryFile(b'GRPH', 'cBcqqd', 'a graph')
+
+
+def _write_graph(path: str, kind: str, weighted: bool, gap: int|float,
+        offsets: array | memoryview, *columns: array | memoryview) -> None:
+    """Writes the graph in the compressed sparse row layout to the file "path"."""
+
+    n: int = len(offsets) - 1
+    nnz: int = len(columns[0])
+    wtype: str = typecode_of(columns[-1])
+    _GRAPH_FILE.write(path, (kind.encode(), weighted, wtype.encode(), n, nnz, gap), (offsets, *columns))
+
+
+def _graph_layout(kind: bytes, weighted: int, wtype: bytes, n: int, nnz: int, gap: float
+        ) -> list[tuple[int, str]]:
+
+    n_weights: int = 2 if kind == b'F' else 1    # Capacities and flows or weights
+    return [(n + 1, 'q'), (nnz, 'q')] + [(nnz, wtype.decode())] * n_weights
+
+
+def _read_graph(path: str) -> tuple[str, bool, int|float, int, list[memoryview | array]]:
+    """Maps the file "path" to memory.
+
+    Returns the kind of the graph, weighted, gap, the number of verticies and
+    the arrays (offsets, targets, weights, ...) as read-only views of the mapped
+    pages, nothing is copied on a little-endian machine.
+    """
+
+    (kind, weighted, _, n, _, gap), buffers = _GRAPH_FILE.map(path, _graph_layout)
+    if gap.is_integer():
+        gap = int(gap)
+
+    return kind.decode(), bool(weighted), gap, n, buffers
+
+
+def _counting_sort(keys, n: int, order: Iterable[int]) -> array:
+    """Stable sort of the indices "order" by "keys" in the range 0..n-1. O(n + len(order))"""
+
+    count: list[int] = [0] * (n + 1)
+    size: int = 0
+
+    for i in order:
+        count[keys[i] + 1] += 1
+        size += 1
+
+    for k in range(n):
+        count[k + 1] += count[k]
+
+    out: array = array('q', bytes(8 * size))
+
+    for i in order:
+        k = keys[i]
+        out[count[k]] = i
+        count[k] += 1
+
+    return out
+
+
+class _Matrix(ABC):
+    """The base of cost matrices: reading rows of the matrix"""
+
+    _n: int
+
+    @abstractmethod
+    def row(self, u: int) -> Iterator[tuple[int, int|float]]:
+        """Yields (v, weight) for every arrow (u, v)"""
+
+    def arrows(self, upper: bool = False) -> tuple[list[int], list[int], list[int|float]]:
+        """Returns arrows (us, vs, ws) ordered by (u, v), only u < v if "upper"."""
+
+        us: list[int] = []
+        vs: list[int] = []
+        ws: list[int|float] = []
+
+        for u in range(self._n):
+            for v, w in self.row(u):
+                if not upper or u < v:
+                    us.append(u)
+                    vs.append(v)
+                    ws.append(w)
+
+        return us, vs, ws
+
+
+class DenseMatrix(_Matrix):
+    """The dense V×V cost matrix stored as a list of lists.
+
+    The sorted neighbors of every vertex are kept in an index updated by "set",
+    so a row is read in O(deg) instead of scanning all V cells.
+    """
+
+    def __init__(self, n_verticies: int, gap: int|float) -> None:
+        self._n: int = n_verticies
+        self._gap: int|float = gap
+
+        self._matrix: MatrixType
+        self._matrix = [
+                    [0 if i == j else gap for j in range(self._n)
+                ] for i in range(self._n)
+            ]
+        self._index: list[list[int]] = [[] for _ in range(self._n)]    # Sorted neighbors
+
+    def get(self, u: int, v: int) -> int|float:
+        return self._matrix[u][v]
+
+    def set(self, u: int, v: int, w: int|float) -> None:
+        """Set the weight of (u, v). O(deg(u))"""
+
+        gap = self._gap
+        old: int|float = self._matrix[u][v]
+        self._matrix[u][v] = w
+
+        if u == v or (old != gap) == (w != gap):
+            return
+
+        neighbors: list[int] = self._index[u]
+        if w != gap:
+            insort(neighbors, v)
+        else:
+            del neighbors[bisect_left(neighbors, v)]
+
+    def set_many(self, us: array, vs: array, ws: array) -> None:
+        """Set the weights of (us[i], vs[i]) in one pass"""
+
+        for u, v, w in zip(us, vs, ws):
+            self.set(u, v, w)
+
+    def row(self, u: int) -> Iterator[tuple[int, int|float]]:
+        """Yields (v, weight) for every arrow (u, v). O(deg(u))"""
+
+        weights: list[int|float] = self._matrix[u]
+        for v in self._index[u]:
+            yield v, weights[v]
+
+    def csr(self) -> tuple[array, array, array]:
+        """Returns the matrix in the compressed sparse row layout. O(V + E)"""
+
+        offsets: array = array('q', [0])
+        targets: array = array('q')
+        weights: list[int|float] = []
+
+        for u in range(self._n):
+            for v, w in self.row(u):
+                targets.append(v)
+                weights.append(w)
+            offsets.append(len(targets))
+
+        return offsets, targets, as_weights(weights)
+
+    @property
+    def matrix(self) -> MatrixType:
+        return self._matrix
+
+
+class CsrMatrix(_Matrix):
+    """The compressed sparse row (CSR) cost matrix.
+
+    The row "u" is targets[offsets[u]:offsets[u+1]] with the matching weights,
+    targets of a row are sorted. A new arrow is appended to the pending buffers
+    (src, dst, wgt) and merged into the rows on the next read in O(V + E).
+    Removed arrows are indices in "dead" (merged rows) and "gone" (pending
+    arrows) dropped on merge: the "gap" is not written to the typed weights,
+    so a removal does not turn integer weights to doubles. Of several pending
+    arrows (u, v) the last one wins. Arrows set one by one are indexed in
+    "pending", so reading a weight does not force a merge.
+    """
+
+    def __init__(self, n_verticies: int, gap: int|float,
+            offsets: array | memoryview | None = None,
+            targets: array | memoryview | None = None,
+            weights: array | memoryview | None = None) -> None:
+
+        self._n: int = n_verticies
+        self._gap: int|float = gap
+
+        # Read-only memoryviews (of a mapped file) are copied on the first change
+        self._offsets: array | memoryview = array('q', bytes(8 * (self._n + 1)))
+        self._targets: array | memoryview = array('q')
+        self._weights: array | memoryview = array('q')    # 'q' for integer weights, 'd' otherwise
+        if offsets is not None and targets is not None and weights is not None:
+            self._offsets, self._targets, self._weights = offsets, targets, weights
+
+        # Pending arrows which are not merged into the rows yet
+        self._src: array = array('q')
+        self._dst: array = array('q')
+        self._wgt: array = array(typecode_of(self._weights))
+        self._pending: dict[tuple[int, int], int] | None = {}    # (u, v): index, None after "set_many"
+        self._dead: set[int] = set()    # Removed arrows in the merged rows
+        self._gone: set[int] = set()    # Pending arrows which are removals
+
+    def _promote(self, w: int|float) -> None:
+        """Switch the weights to doubles if "w" is not an integer"""
+
+        if typecode_of(self._weights) == 'q' and not isinstance(w, int):
+            self._weights = array('d', self._weights)
+            self._wgt = array('d', self._wgt)
+
+    def _find(self, u: int, v: int) -> int:
+        """Index of the arrow (u, v) in the merged rows or -1. O(deg(u))"""
+
+        targets = self._targets
+        for k in range(self._offsets[u], self._offsets[u + 1]):
+            if targets[k] == v:
+                return k
+        return -1
+
+    def _merge(self) -> None:
+        """Merge the pending arrows into the rows. O(V + E)"""
+
+        n: int = self._n
+        offsets, targets = self._offsets, self._targets
+
+        src: array = array('q')
+        for u in range(n):
+            src.extend(repeat(u, offsets[u + 1] - offsets[u]))
+        src += self._src
+        dst: array = array('q', targets)
+        dst += self._dst
+        wgt: array = array(self._wgt.typecode, self._weights)
+        wgt += self._wgt
+        dead: set[int] = self._dead | {len(targets) + i for i in self._gone}
+
+        order: array = _counting_sort(dst, n, range(len(dst)))
+        order = _counting_sort(src, n, order)
+
+        new_offsets: array = array('q', bytes(8 * (n + 1)))
+        new_targets: array = array('q')
+        new_weights: array = array(wgt.typecode)
+
+        size: int = len(order)
+        for k in range(size):
+            i = order[k]
+            u, v, w = src[i], dst[i], wgt[i]
+
+            if k + 1 < size:    # The later duplicate of (u, v) wins
+                j = order[k + 1]
+                if src[j] == u and dst[j] == v:
+                    continue
+
+            if i in dead or w == self._gap:
+                continue
+
+            new_targets.append(v)
+            new_weights.append(w)
+            new_offsets[u + 1] += 1
+
+        for u in range(n):
+            new_offsets[u + 1] += new_offsets[u]
+
+        self._offsets, self._targets, self._weights = new_offsets, new_targets, new_weights
+        self._src, self._dst, self._wgt = array('q'), array('q'), array(wgt.typecode)
+        self._pending, self._dead, self._gone = {}, set(), set()
+
+    def get(self, u: int, v: int) -> int|float:
+        """The weight of (u, v). O(deg(u))"""
+
+        if self._pending is None:
+            self._merge()
+
+        w: int|float = self._gap
+        i: int | None = self._pending.get((u, v))    # type: ignore
+
+        if i is not None:
+            if i not in self._gone:
+                w = self._wgt[i]
+        else:
+            k: int = self._find(u, v)
+            if k != -1 and k not in self._dead:
+                w = self._weights[k]
+
+        if w == self._gap and u == v:
+            return 0
+        return w
+
+    def set(self, u: int, v: int, w: int|float) -> None:
+        """Set the weight of (u, v). O(deg(u)) for an existing arrow, O(1) otherwise"""
+
+        removed: bool = w == self._gap
+        if not removed:
+            self._promote(w)
+
+        if not self._src:    # A pending arrow (u, v) would override the merged one
+            k: int = self._find(u, v)
+            if k != -1:
+                if removed:
+                    self._dead.add(k)
+                    return
+                if isinstance(self._weights, memoryview):
+                    self._weights = array(self._weights.format, self._weights)
+                self._dead.discard(k)
+                self._weights[k] = w
+                return
+
+        if removed:
+            self._gone.add(len(self._src))
+        if self._pending is not None:
+            self._pending[u, v] = len(self._src)
+        self._src.append(u)
+        self._dst.append(v)
+        self._wgt.append(0 if removed else w)
+
+    def set_many(self, us: array, vs: array, ws: array) -> None:
+        """Append the arrows (us[i], vs[i], ws[i]) to the pending buffers. O(E)"""
+
+        if ws.typecode == 'd':
+            self._promote(0.0)
+        elif self._wgt.typecode == 'd':
+            ws = array('d', ws)
+
+        self._src += us
+        self._dst += vs
+        self._wgt += ws
+        self._pending = None
+
+    def csr(self) -> tuple[array | memoryview, array | memoryview, array | memoryview]:
+        """Returns the merged (offsets, targets, weights) without removed arrows"""
+
+        if self._src or self._dead:
+            self._merge()
+        return self._offsets, self._targets, self._weights
+
+    def row(self, u: int) -> Iterator[tuple[int, int|float]]:
+        """Yields (v, weight) for every arrow (u, v). O(deg(u))"""
+
+        if self._src:
+            self._merge()
+
+        gap, dead = self._gap, self._dead
+        targets, weights = self._targets, self._weights
+        for k in range(self._offsets[u], self._offsets[u + 1]):
+            v, w = targets[k], weights[k]
+            if v != u and w != gap and k not in dead:
+                yield v, w
+
+    @property
+    def matrix(self) -> MatrixType:
+        """Builds the dense cost matrix. O(V^2)"""
+
+        matrix: MatrixType = DenseMatrix(self._n, self._gap).matrix
+        for u in range(self._n):
+            for v, w in self.row(u):
+                matrix[u][v] = w
+        return matrix
+
+
+class NumpyMatrix(_Matrix):
+    """The dense V×V cost matrix stored as a contiguous NumPy array of "dtype".
+
+    Rows and arrows are found by vectorized comparison with "gap", "matrix"
+    is the array itself (no copy).
+    """
+
+    def __init__(self, n_verticies: int, gap: int|float, dtype: str = 'float64') -> None:
+
+        if np is None:
+            raise ImportError("storage='numpy' requires NumPy")
+
+        self._n: int = n_verticies
+        self._gap: int|float = gap
+        self._dtype = np.dtype(dtype)
+
+        if self._dtype.kind in 'iu' and not float(gap).is_integer():
+            raise ValueError(f"gap={gap} does not fit into {self._dtype}")
+
+        self._matrix = np.full((self._n, self._n), gap, dtype=self._dtype)
+        np.fill_diagonal(self._matrix, 0)
+
+    def _mask(self):
+        """The boolean matrix of arrows"""
+
+        mask = self._matrix != self._gap
+        np.fill_diagonal(mask, False)
+        return mask
+
+    def get(self, u: int, v: int) -> int|float:
+        return self._matrix[u, v].item()
+
+    def set(self, u: int, v: int, w: int|float) -> None:
+        self._matrix[u, v] = w
+
+    def set_many(self, us: array, vs: array, ws: array) -> None:
+        """Set the weights of (us[i], vs[i]) with one vectorized assignment"""
+
+        rows = np.frombuffer(us, dtype=np.int64)
+        cols = np.frombuffer(vs, dtype=np.int64)
+        self._matrix[rows, cols] = np.frombuffer(ws, dtype=ws.typecode)
+
+    def row(self, u: int) -> Iterator[tuple[int, int|float]]:
+        """Yields (v, weight) for every arrow (u, v). O(V) vectorized"""
+
+        weights = self._matrix[u]
+        vs = np.flatnonzero(weights != self._gap)
+        vs = vs[vs != u]
+        return zip(vs.tolist(), weights[vs].tolist())
+
+    def arrows(self, upper: bool = False) -> tuple[list[int], list[int], list[int|float]]:
+        """Returns arrows (us, vs, ws) ordered by (u, v), only u < v if "upper"."""
+
+        mask = self._mask()
+        if upper:
+            mask = np.triu(mask, 1)
+
+        us, vs = np.nonzero(mask)
+        return us.tolist(), vs.tolist(), self._matrix[us, vs].tolist()
+
+    def csr(self) -> tuple[array, array, array]:
+        """Returns the matrix in the compressed sparse row layout"""
+
+        mask = self._mask()
+        us, vs = np.nonzero(mask)
+
+        offsets = np.zeros(self._n + 1, dtype=np.int64)
+        np.cumsum(mask.sum(axis=1), out=offsets[1:])
+
+        typecode: str = 'q' if self._dtype.kind in 'iub' else 'd'
+        weights = self._matrix[us, vs].astype(typecode)
+
+        return (_as_array(offsets, 'q'), _as_array(vs.astype(np.int64), 'q'),
+                _as_array(weights, typecode))
+
+    @property
+    def matrix(self):
+        return self._matrix
+
 
 class Graph:
+    """The base graph.
+
+    Edges are added one by one ("add_edge"/"add_arrow") or in bulk from tuples
+    in the "EdgeType" layout ("add_edges_from") or from parallel arrays
+    ("add_arrays"), with the same rules for weights.
+
+    Every change of the graph increments "version". The adjacency, edge and arrow
+    lists are read-only snapshots cached until the next change, a consumer can
+    compare the version it has seen with "version" to find out they are stale.
+
+    Single changes (adding, removing an edge, updating a weight) are kept in
+    the change log of the last "log_size" changes, see "changes". An undirected
+    edge is logged once as (u, v).
+    """
+
+    _directed: bool = True    # An undirected graph stores every edge in both directions
+    _kind: str = 'G'    # The kind of the graph in a graph file
 
     def __init__(self, n_verticies: int, gap: int|float =-1,
-            weighted: bool = False):
+            weighted: bool = False, storage: str = 'matrix', dtype: str = 'float64',
+            log_size: int = 1024):
 
         self._n: int = n_verticies    # Number of verticies in a graph
         self._gap: int|float = gap          # No edge
         self._weighted: bool = weighted    # Weightid graph
+        self._storage: str = storage    # 'matrix', 'numpy' (dense V×V of "dtype") or 'csr' (sparse)
+        self._dtype: str = dtype
 
-        self._matrix: MatrixType     # Cost matrix
-        self._matrix = [
-                    [0 if i == j else gap for j in range(self._n)
-                ] for i in range(self._n)
-            ]
+        self._matrix: DenseMatrix | CsrMatrix | NumpyMatrix     # Cost matrix
+        if storage == 'matrix':
+            self._matrix = DenseMatrix(n_verticies, gap)
+        elif storage == 'csr':
+            self._matrix = CsrMatrix(n_verticies, gap)
+        elif storage == 'numpy':
+            self._matrix = NumpyMatrix(n_verticies, gap, dtype)
+        else:
+            raise ValueError(f"Unknown storage: {storage!r}")
+
+        self._version: int = 0    # Incremented on every change of the graph
+        self._views: dict[str, tuple[int, Any]] = {}    # name: (version, cached view)
+
+        self._log: deque[ChangeType] = deque(maxlen=log_size)    # The last changes
+        self._log_start: int = 0    # The log has no changes made before this version
+
+    def _view(self, name: str, build: Callable[[], Any]) -> Any:
+        """Returns the cached view "name", rebuilding it if the graph has changed"""
+
+        cached = self._views.get(name)
+        if cached is None or cached[0] != self._version:
+            cached = (self._version, build())
+            self._views[name] = cached
+        return cached[1]
 
     @property
-    def adjacency_list(self) -> dict[int, list[int]]:
-        """Returns the adjacency list"""
+    def version(self) -> int:
+        return self._version
 
-        D: dict = {}   # adjacency list
+    @property
+    def gap(self) -> int|float:
+        """The weight meaning there is no edge"""
+        return self._gap
 
-        for i in range(self._n):
-            for j in range(self._n):
-                
-                if i != j and (self._matrix[i][j] != self._gap):
-        
-                    if D.get(i):
-                        D[i].append(j) 
-                    else: 
-                        D[i] = [j]
-        return D                   
-      
-    @property    
+    @property
+    def storage(self) -> str:
+        """'matrix', 'csr' or 'numpy'"""
+        return self._storage
+
+    def changes(self, since: int) -> list[ChangeType] | None:
+        """Returns changes (version, u, v, old weight, new weight) made after the version "since".
+
+        Returns None if the log does not reach back to "since" (it is full or
+        edges were added in bulk), then the consumer has to start from scratch.
+        A weight equal to "gap" means there was no edge or the edge is removed.
+        """
+
+        if since >= self._version:
+            return []
+        if since < self._log_start or not self._log or self._log[0][0] > since + 1:
+            return None
+        return [change for change in self._log if change[0] > since]
+
+    def _change(self, u: int, v: int, w: int|float) -> None:
+        """Sets the weight of (u, v) (and of (v, u) if undirected) and logs the change"""
+
+        old: int|float = self._matrix.get(u, v)
+
+        self._matrix.set(u, v, w)
+        if not self._directed:
+            self._matrix.set(v, u, w)
+
+        self._version += 1
+        self._log.append((self._version, u, v, old, w))
+
+        if u != v:    # Loops are not in the views
+            self._patch_views(u, v, old)
+
+    def _patch_views(self, u: int, v: int, old: int|float) -> None:
+        """Brings the views cached before the change of (u, v) up to date without rebuilding"""
+
+        w: int|float = self._matrix.get(u, v)    # As stored, e.g. rounded to float32
+        patches: dict[str, Callable[..., Any]] = {
+            'adjacency_list': self._patch_adjacency_list,
+            'edge_list': self._patch_edge_list,
+            'arrow_list': self._patch_edge_list,
+            'max_int_weight': self._patch_max_int_weight,
+            'reversed_graph': self._patch_reversed_graph,
+        }
+
+        for name, (version, view) in self._views.items():
+            if version == self._version - 1:
+                self._views[name] = (self._version, patches[name](view, u, v, old, w))
+
+    def _patch_adjacency_list(self, view: MappingProxyType[int, tuple[int, ...]],
+            u: int, v: int, old: int|float, w: int|float) -> MappingProxyType[int, tuple[int, ...]]:
+        """Replaces the rows of "u" (and "v" if undirected). O(V + deg(u) + deg(v))"""
+
+        rows: dict[int, tuple[int, ...]] = dict(view)    # The mapping handed out stays as it was
+        for a, b in ((u, v), (v, u))[:1 if self._directed else 2]:
+            row: tuple[int, ...] = rows.get(a, ())
+            i: int = bisect_left(row, b)
+            row = row[:i] + ((b,) if w != self._gap else ()) + row[i + (old != self._gap):]
+
+            if not row:
+                rows.pop(a, None)
+            elif a not in rows:    # Keep the verticies in order as "_adjacency_list" does
+                rows = dict(sorted({**rows, a: row}.items()))
+            else:
+                rows[a] = row
+
+        return MappingProxyType(rows)
+
+    def _patch_edge_list(self, view: tuple[EdgeType, ...],
+            u: int, v: int, old: int|float, w: int|float) -> tuple[EdgeType, ...]:
+        """Replaces the entry of (u, v) in the list ordered by (u, v). O(log E) search and a copy"""
+
+        if not self._directed and u > v:
+            u, v = v, u
+
+        i: int = bisect_left(view, (u, v), key=lambda edge: edge[-2:])
+        entry: tuple[EdgeType, ...] = ()
+        if w != self._gap:
+            entry = ((w, u, v) if self._weighted else (u, v),)
+
+        return view[:i] + entry + view[i + (old != self._gap):]
+
+    def _patch_reversed_graph(self, view: "Graph",
+            u: int, v: int, old: int|float, w: int|float) -> "Graph":
+        """Changes the arrow (v, u) of the cached reversed graph. O(1) to O(deg(v))"""
+
+        view._change(v, u, w)
+        return view
+
+    def _patch_max_int_weight(self, view: int | None,
+            u: int, v: int, old: int|float, w: int|float) -> int | None:
+        """Updates the maximum weight by a new or a heavier edge, otherwise rebuilds it.
+
+        A removal is rebuilt, the maximum may be gone.
+        """
+
+        if w != self._gap and (not isinstance(w, Integral) or w < 0):
+            return None
+        if w != self._gap and view is not None and (old == self._gap or old <= w):
+            return max(view, int(w))
+
+        return self._max_int_weight()
+
+    def _check_edge(self, u: int, v: int) -> None:
+
+        if u == v or self._matrix.get(u, v) == self._gap:
+            raise KeyError(f"There is no edge ({u}, {v})")
+
+    def update_weight(self, u: int, v: int, w: int|float) -> None:
+        """Changing the weight of the existing edge (u, v). O(deg(u))"""
+
+        self._check_edge(u, v)
+        self._change(u, v, w)
+
+    def save(self, path: str) -> None:
+        """Writes the graph to the binary file "path" (see "load")"""
+        _write_graph(path, self._kind, self._weighted, self._gap, *self._matrix.csr())
+
+    @classmethod
+    def load(cls, path: str):
+        """Opens the graph saved by "save" with the CSR storage.
+
+        The file is mapped to memory and read by the algorithms directly, so
+        loading takes no time to copy and processes share the mapped pages.
+        """
+
+        kind, weighted, gap, n, buffers = _read_graph(path)
+        classes: dict[str, type] = {c._kind: c for c in (Graph, UGraph, DGraph)}
+
+        if kind not in classes or not issubclass(classes[kind], cls):
+            raise ValueError(f"{path} does not contain {cls.__name__}")
+
+        graph = classes[kind](n, gap=gap, weighted=weighted, storage='csr')
+        graph._matrix = CsrMatrix(n, gap, *buffers)
+        return graph
+
+    @classmethod
+    def from_edges(cls, n_verticies: int, edges: Iterable[EdgeType], **kwargs):
+        """Creates the graph from edges (w, u, v) or (u, v)"""
+
+        graph = cls(n_verticies, **kwargs)
+        graph.add_edges_from(edges)
+        return graph
+
+    @classmethod
+    def from_arrays(cls, n_verticies: int, us: Iterable[int], vs: Iterable[int],
+            ws: Iterable[int|float] | None = None, **kwargs):
+        """Creates the graph from parallel arrays of verticies and weights"""
+
+        graph = cls(n_verticies, **kwargs)
+        graph.add_arrays(us, vs, ws)
+        return graph
+
+    def add_edges_from(self, edges: Iterable[EdgeType]) -> None:
+        """Adding edges (w, u, v) or (u, v) to the graph"""
+        self.add_arrays(*_edge_arrays(edges))
+
+    def add_arrays(self, us: Iterable[int], vs: Iterable[int],
+            ws: Iterable[int|float] | None = None) -> None:
+        """Adding edges (us[i], vs[i], ws[i]) to the graph in one pass.
+
+        Any sequences or buffers (array, NumPy arrays) are accepted, bounds of
+        verticies are checked for all edges before the graph is changed.
+        """
+
+        us_: array = _as_array(us, 'q')
+        vs_: array = _as_array(vs, 'q')
+        ws_: array | None = None if ws is None else as_weights(ws)
+        check_arrays(self._n, us_, vs_, ws_)
+
+        if not self._weighted or ws_ is None:
+            ws_ = array('q', [1]) * len(us_)
+        elif 0 in ws_:    # The same rule as in "add_edge": no weight means 1
+            ws_ = array(ws_.typecode, [w or 1 for w in ws_])
+
+        if self._directed:
+            self._matrix.set_many(us_, vs_, ws_)
+        else:    # Both arrows of an edge before the next edge, so a repeated edge is the same both ways
+            m: int = len(us_)
+            sources: array = array('q', bytes(16 * m))
+            targets: array = array('q', bytes(16 * m))
+            weights: array = array(ws_.typecode, bytes(16 * m))
+            sources[0::2], sources[1::2] = us_, vs_
+            targets[0::2], targets[1::2] = vs_, us_
+            weights[0::2], weights[1::2] = ws_, ws_
+            self._matrix.set_many(sources, targets, weights)
+        self._version += 1
+        self._log_start = self._version    # Edges added in bulk are not logged
+
+    def neighbors(self, u: int) -> Iterator[tuple[int, int|float]]:
+        """Yields (v, weight) for every neighbor "v" of the vertex "u"."""
+        return self._matrix.row(u)
+
+    def weight(self, u: int, v: int) -> int|float:
+        """Returns the weight of (u, v) or "gap" if there is no such edge"""
+        return self._matrix.get(u, v)
+
+    @property
+    def adjacency_list(self) -> MappingProxyType[int, tuple[int, ...]]:
+        """Returns the read-only adjacency list.
+
+        O(1) while the graph is not changed, a single change updates the cached
+        list in O(V + deg), bulk changes rebuild it.
+        """
+        return self._view('adjacency_list', self._adjacency_list)
+
+    def _adjacency_list(self) -> MappingProxyType[int, tuple[int, ...]]:
+
+        D: dict[int, list[int]] = {}   # adjacency list
+
+        us, vs, _ = self._matrix.arrows()
+        for i, j in zip(us, vs):
+            if i in D:
+                D[i].append(j)
+            else:
+                D[i] = [j]
+
+        return MappingProxyType({i: tuple(js) for i, js in D.items()})
+
+    @property
+    def max_int_weight(self) -> int | None:
+        """The maximum weight if all weights are non-negative integers, None otherwise.
+
+        0 for a graph without edges. O(1) until the graph changes.
+        """
+        return self._view('max_int_weight', self._max_int_weight)
+
+    def _max_int_weight(self) -> int | None:
+
+        top: int = 0
+        for w in self._matrix.arrows()[2]:
+            if not isinstance(w, Integral) or w < 0:
+                return None
+            top = max(top, int(w))
+
+        return top
+
+    @property
     def verticies(self) -> list[int]:
         return list(range(self._n))
 
     @property
     def cost_matrix(self) -> MatrixType:
-        return self._matrix
+        """The cost matrix, the NumPy array itself with storage='numpy'"""
+        return self._matrix.matrix
 
     def __repr__(self):
-        text = f"Graph(n_verticies={self._n}, gap={self._gap}, weighted={self._weighted})"
+        text = f"Graph(n_verticies={self._n}, gap={self._gap}, weighted={self._weighted}, storage={self._storage!r})"
         return text
 
 
 class UGraph(Graph):
     """The undirected graph"""
 
+    _directed = False
+    _kind = 'U'
+
     def add_edge(self, u: int, v: int, w: int|None=None) -> None:
         """Adding the new edge to the graph"""
-        # __import__('pdb').set_trace()
-        if self._weighted and w:
-            self._matrix[u][v] = w
-            self._matrix[v][u] = w
-        else:
-            self._matrix[u][v] = 1
-            self._matrix[v][u] = 1
 
-    
-    @property        
-    def edge_list(self) -> list[EdgeType]:
-        """Returns the edge list of the Graph"""
-        
-        edges: list[EdgeType] = []
+        if not (self._weighted and w):
+            w = 1
 
-        for u in range(self._n):
-            for v in range(self._n):
-                
-                w: int | float
-                w = self._matrix[u][v]    # Weight of edge (u, v)
-                
-                if self._weighted:
-                    if  u < v and w != self._gap:
-                        edge: EdgeType = (w, u, v)
-                        edges.append(edge)
-                else:
-                    if  u < v and w != self._gap:
-                        edge: EdgeType = (u, v)
-                        edges.append(edge)
+        self._change(u, v, w)
 
-        return edges
+    def remove_edge(self, u: int, v: int) -> None:
+        """Removing the edge (u, v) from the graph. O(deg(u) + deg(v))"""
+
+        self._check_edge(u, v)
+        self._change(u, v, self._gap)
+
+    @property
+    def edge_list(self) -> tuple[EdgeType, ...]:
+        """Returns the read-only edge list of the Graph, cached as "adjacency_list" is"""
+        return self._view('edge_list', self._edge_list)
+
+    def _edge_list(self) -> tuple[EdgeType, ...]:
+
+        us, vs, ws = self._matrix.arrows(upper=True)    # ws: weights of edges (us, vs)
+
+        if self._weighted:
+            return tuple(zip(ws, us, vs))
+        return tuple(zip(us, vs))
 
 
 class DGraph(Graph):
     """Directed Graph"""
-        
+
+    _kind = 'D'
+
     def add_arrow(self, u: int, v: int, w: int|None=None):
         """Adding the new edge to the graph"""
 
-        if w and self._weighted:
-            self._matrix[u][v] = w
+        if not (w and self._weighted):
+            w = 1
 
-        else:
-            self._matrix[u][v] = 1
+        self._change(u, v, w)
 
-    @property        
-    def arrow_list(self) -> list[EdgeType]:
-        """Returns the edge list of the Graph"""
-        
-        edges: list[EdgeType] = []
+    def remove_arrow(self, u: int, v: int) -> None:
+        """Removing the arrow (u, v) from the graph. O(deg(u))"""
 
-        for u in range(self._n):
-            for v in range(self._n):
-                
-                w: int|float = self._matrix[u][v]    # Weight of edge (u, v)
-                
-                edge: EdgeType
-                if  u != v and w != self._gap:
+        self._check_edge(u, v)
+        self._change(u, v, self._gap)
+
+    def reverse(self) -> "DGraph":
+        """Returns the new graph with all arrows reversed, in the same storage. O(V + E)"""
+
+        us, vs, ws = self._matrix.arrows()
+        graph = type(self)(self._n, gap=self._gap, weighted=self._weighted,
+                storage=self._storage, dtype=self._dtype)
+        graph.add_arrays(vs, us, ws)
+        return graph
+
+    @property
+    def reversed_graph(self) -> "DGraph":
+        """The reversed graph shared by searches, cached as "adjacency_list" is.
 
-                    if self._weighted:
-                        edge = (w, u, v)
-                    else:
-                        edge = (u, v)
+        It follows the changes of this graph, so it must not be changed itself:
+        use "reverse" for a copy to change.
+        """
+        return self._view('reversed_graph', self.reverse)
 
-                    edges.append(edge)
+    @property
+    def arrow_list(self) -> tuple[EdgeType, ...]:
+        """Returns the read-only arrow list of the Graph, cached as "adjacency_list" is"""
+        return self._view('arrow_list', self._arrow_list)
+
+    def _arrow_list(self) -> tuple[EdgeType, ...]:
 
-        return edges
+        us, vs, ws = self._matrix.arrows()    # ws: weights of arrows (us, vs)
+
+        if self._weighted:
+            return tuple(zip(ws, us, vs))
+        return tuple(zip(us, vs))
 
 
 class FGraph:
-    """The flow graph"""
+    """The flow graph.
+
+    Arcs are stored as a structure of typed arrays. The arc 2k is the k-th arrow
+    and 2k+1 is its reverse arc, so the pair of the arc "a" is "a ^ 1". A reverse
+    arc has zero capacity and minus the flow of its arrow, the residual capacity
+    of any arc is capacity[a] - flow[a]. The arcs leaving "u" are linked:
+    first_arc[u], next_arc[first_arc[u]], ... until -1. Parallel arrows are
+    separate arcs.
+    """
 
     def __init__(self, n_verticies: int):
 
         self._n = n_verticies    # Number of verticies in graph
-        
-        MatrixFlowType = list[list[FlowType]]
-        self._matrix: MatrixFlowType
-        self._matrix = [
-                [[0, 0, 1] for _ in range(self._n)] for _ in range(self._n)
-                ]
-            
+
+        self._first: array = array('q', [-1]) * self._n    # The first arc leaving a vertex
+        self._next: array = array('q')    # The next arc leaving the same vertex
+        self._head: array = array('q')    # The vertex an arc leads to
+        self._capacity: array = array('q')    # 'q' for integer capacities, 'd' otherwise
+        self._flow: array = array('q')
+
+    def _promote(self, typecode: str) -> None:
+        """Switch capacities and flows to doubles if "typecode" is 'd'"""
+
+        if typecode == 'd' and self._capacity.typecode == 'q':
+            self._capacity = array('d', self._capacity)
+            self._flow = array('d', self._flow)
+
     def add_arrow(self, u: int, v: int, w: list[float|int]) -> None:
-        """Adding the new edge to the graph"""
+        """Adding the new arrow with w = [capacity, flow, 1] to the graph"""
 
-        self._matrix[u][v] = w
-        t: FlowType = w[:]
-        t[2] *= -1
-        self._matrix[v][u] = t
+        c, f = w[0], w[1]
+        self._promote('q' if isinstance(c, int) and isinstance(f, int) else 'd')
+
+        for x, y in ((u, v), (v, u)):
+            self._head.append(y)
+            self._next.append(self._first[x])
+            self._first[x] = len(self._head) - 1
+
+        self._capacity.extend((c, 0))
+        self._flow.extend((f, -f))
+
+    def set_capacity(self, a: int, c: int|float) -> None:
+        """Changes the capacity of the arrow of the arc "a" (even), the flow is kept"""
+
+        if a % 2:
+            raise ValueError(f"The arc {a} is the reverse arc of an arrow")
+
+        self._promote('q' if isinstance(c, int) else 'd')
+        self._capacity[a] = c
+
+    def arcs(self, u: int) -> Iterator[int]:
+        """Yields the arcs leaving the vertex "u"."""
+
+        a: int = self._first[u]
+        while a != -1:
+            yield a
+            a = self._next[a]
+
+    def snapshot(self) -> array:
+        """Returns a copy of the flows. O(E)"""
+        return array(self._flow.typecode, self._flow)
+
+    def restore(self, flow: Iterable[int|float]) -> None:
+        """Restores the flows from "snapshot" (or any sequence of one flow per arc)"""
+
+        flow_: array = array(self._flow.typecode, flow)
+        if len(flow_) != len(self._flow):
+            raise ValueError(f"Expected {len(self._flow)} flows, got {len(flow_)}")
+        self._flow[:] = flow_
+
+    def reset(self) -> None:
+        """Sets all flows to zero"""
+        self._flow = array(self._flow.typecode, bytes(8 * len(self._flow)))
+
+    @property
+    def first_arc(self) -> array:
+        return self._first
+
+    @property
+    def next_arc(self) -> array:
+        return self._next
 
-    @property    
+    @property
+    def head(self) -> array:
+        return self._head
+
+    @property
+    def capacity(self) -> array:
+        return self._capacity
+
+    @property
+    def flow(self) -> array:
+        return self._flow
+
+    @property
+    def n_arrows(self) -> int:
+        return len(self._head) // 2
+
+    @property
     def verticies(self) -> list[int]:
         return list(range(self._n))
 
     @property
     def cost_matrix(self) -> MatrixFlowType:
-        return self._matrix
+        """Builds the dense matrix of [capacity, flow, sign]. O(V^2)
+
+        The sign is 1 for an arrow (u, v) and -1 for the reverse entry (v, u).
+        Parallel arrows are summed up, an arrow wins over a reverse entry.
+        """
+
+        matrix: MatrixFlowType
+        matrix = [[[0, 0, 1] for _ in range(self._n)] for _ in range(self._n)]
+
+        for sign in (-1, 1):
+            for a in range(0 if sign == 1 else 1, len(self._head), 2):
+                u, v = self._head[a ^ 1], self._head[a]
+                c, f = self._capacity[a & ~1], self._flow[a & ~1]
+
+                entry: FlowType = matrix[u][v]
+                if entry[2] == sign and (entry[0] or entry[1]):
+                    entry[0] += c
+                    entry[1] += f
+                else:
+                    matrix[u][v] = [c, f, sign]
+
+        return matrix
+
+    def save(self, path: str) -> None:
+        """Writes arrows with capacities and flows to the binary file "path"."""
+
+        n_arrows: int = self.n_arrows
+        order: array = _counting_sort(self._head[1::2], self._n, range(n_arrows))
+
+        offsets: array = array('q', bytes(8 * (self._n + 1)))
+        targets: array = array('q', bytes(8 * n_arrows))
+        capacities: array = array(self._capacity.typecode, bytes(8 * n_arrows))
+        flows: array = array(self._flow.typecode, bytes(8 * n_arrows))
+
+        for k, i in enumerate(order):
+            offsets[self._head[2 * i + 1] + 1] += 1
+            targets[k] = self._head[2 * i]
+            capacities[k] = self._capacity[2 * i]
+            flows[k] = self._flow[2 * i]
+
+        for u in range(self._n):
+            offsets[u + 1] += offsets[u]
+
+        _write_graph(path, 'F', True, 0, offsets, targets, capacities, flows)
+
+    @classmethod
+    def load(cls, path: str) -> "FGraph":
+        """Reads the flow graph saved by "save".
+
+        Capacities are copied from the mapped file once, flows are copied since
+        they change.
+        """
+
+        kind, _, _, n, (offsets, targets, capacities, flows) = _read_graph(path)
+        if kind != 'F':
+            raise ValueError(f"{path} does not contain FGraph")
+
+        us: array = array('q')
+        for u in range(n):
+            us.extend(repeat(u, offsets[u + 1] - offsets[u]))
+
+        graph = cls(n)
+        graph._add_arcs(us, array('q', targets), array(typecode_of(capacities), capacities),
+                array(typecode_of(flows), flows))
+        return graph
+
+    @classmethod
+    def from_edges(cls, n_verticies: int, edges: Iterable[EdgeType]) -> "FGraph":
+        """Creates the flow graph from arrows (capacity, u, v)"""
+
+        graph = cls(n_verticies)
+        graph.add_edges_from(edges)
+        return graph
+
+    @classmethod
+    def from_arrays(cls, n_verticies: int, us: Iterable[int], vs: Iterable[int],
+            cs: Iterable[int|float]) -> "FGraph":
+        """Creates the flow graph from parallel arrays of verticies and capacities"""
+
+        graph = cls(n_verticies)
+        graph.add_arrays(us, vs, cs)
+        return graph
+
+    def add_edges_from(self, edges: Iterable[EdgeType]) -> None:
+        """Adding arrows (capacity, u, v) with zero flow to the graph"""
+
+        us, vs, cs = _edge_arrays(edges)
+        if cs is None:
+            raise ValueError("Arrows of a flow graph must be (capacity, u, v)")
+        self.add_arrays(us, vs, cs)
+
+    def add_arrays(self, us: Iterable[int], vs: Iterable[int],
+            cs: Iterable[int|float]) -> None:
+        """Adding arrows (us[i], vs[i]) with capacities cs[i] and zero flow to the graph"""
+
+        if cs is None:    # E.g. a chunk of "u v" lines of EdgeListReader
+            raise ValueError("Arrows of a flow graph must be (capacity, u, v)")
+
+        us_: array = _as_array(us, 'q')
+        vs_: array = _as_array(vs, 'q')
+        cs_: array = as_weights(cs)
+        check_arrays(self._n, us_, vs_, cs_)
+
+        self._add_arcs(us_, vs_, cs_, array(cs_.typecode, bytes(8 * len(cs_))))
+
+    def _add_arcs(self, us: array, vs: array, cs: array, fs: array) -> None:
+        """Appends the pairs of arcs for arrows (us[i], vs[i]) with capacities and flows"""
+
+        self._promote(cs.typecode)
+        if self._capacity.typecode == 'd':
+            cs, fs = array('d', cs), array('d', fs)
+
+        m: int = len(us)
+        base: int = len(self._head)
+
+        heads: array = array('q', bytes(16 * m))
+        heads[0::2] = vs
+        heads[1::2] = us
+        self._head += heads
+
+        capacities: array = array(cs.typecode, bytes(16 * m))
+        capacities[0::2] = cs
+        self._capacity += capacities
+
+        flows: array = array(fs.typecode, bytes(16 * m))
+        flows[0::2] = fs
+        flows[1::2] = array(fs.typecode, [-f for f in fs])
+        self._flow += flows
+
+        first, next_ = self._first, self._next
+        next_.extend(repeat(-1, 2 * m))
+        for a in range(base, base + 2 * m):
+            u: int = heads[(a - base) ^ 1]    # The tail of the arc "a" is the head of its pair
+            next_[a] = first[u]
+            first[u] = a
 
     def __repr__(self):
         text = f"FGraph(n_verticies={self._n})"
         return text
 
 
+class EdgeListReader:
+    """Reads a text edge list "u v [w]" per line (whitespace or "delimiter" separated).
+
+    The file is parsed lazily in chunks of "chunk_size" edges, so the memory is
+    bounded by the chunk (plus the vertex map if "remap" is set). With "remap"
+    arbitrary vertex ids (any strings) are mapped to 0..n-1 in the order of
+    their first appearance. Empty lines and lines starting with "#" are skipped.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1 << 16,
+            delimiter: str | None = None, remap: bool = False) -> None:
+
+        self.__path: str = path
+        self.__chunk_size: int = chunk_size
+        self.__delimiter: str | None = delimiter
+        self.__remap: bool = remap
+        self.__ids: dict[str, int] = {}    # Vertex id: vertex
+
+        self.__edges: int = 0    # Edges read by the last pass
+        self.__seconds: float = 0.0    # Time of the last pass
+
+    def __vertex(self, token: str) -> int:
+
+        if not self.__remap:
+            return int(token)
+
+        v: int | None = self.__ids.get(token)
+        if v is None:
+            v = self.__ids[token] = len(self.__ids)
+        return v
+
+    def chunks(self) -> Iterator[tuple[array, array, array | None]]:
+        """Yields the edges as parallel arrays (us, vs, ws), ws is None for "u v" lines.
+
+        Raises ValueError if only some of the lines have weights.
+        """
+
+        self.__edges = 0
+        started: float = time.perf_counter()
+
+        us: array = array('q')
+        vs: array = array('q')
+        ws: list[int|float] = []
+        weighted: bool | None = None    # Set by the first edge, the same for all lines
+
+        def chunk() -> tuple[array, array, array | None]:
+            return us, vs, (as_weights(ws) if weighted else None)
+
+        with open(self.__path) as f:
+            for number, line in enumerate(f, 1):
+
+                tokens: list[str] = line.split(self.__delimiter)
+                if not tokens or not tokens[0].strip() or tokens[0].startswith('#'):
+                    continue
+
+                if weighted is None:
+                    weighted = len(tokens) > 2
+                elif weighted != (len(tokens) > 2):
+                    raise ValueError(f"{self.__path}:{number}: lines must all be 'u v w' or all be 'u v'")
+
+                us.append(self.__vertex(tokens[0].strip()))
+                vs.append(self.__vertex(tokens[1].strip()))
+                if weighted:
+                    w: str = tokens[2].strip()
+                    ws.append(int(w) if w.lstrip('-').isdigit() else float(w))
+
+                if len(us) == self.__chunk_size:
+                    self.__edges += len(us)
+                    yield chunk()
+                    us, vs, ws = array('q'), array('q'), []
+
+        if us:
+            self.__edges += len(us)
+            yield chunk()
+
+        self.__seconds = time.perf_counter() - started
+
+    def n_verticies(self) -> int:
+        """The number of verticies: one more than the maximum vertex. Reads the file"""
+
+        n: int = 0
+        for us, vs, _ in self.chunks():
+            n = max(n, max(us) + 1, max(vs) + 1)
+        return n
+
+    def load(self, cls: type = UGraph, n_verticies: int | None = None, **kwargs):
+        """Builds the graph "cls" (UGraph, DGraph or FGraph) with bulk ingestion.
+
+        If "n_verticies" is not given the file is read twice. Keyword arguments
+        are passed to the constructor, e.g. storage='csr'.
+        """
+
+        if n_verticies is None:
+            n_verticies = self.n_verticies()
+
+        graph = cls(n_verticies, **kwargs)
+        for us, vs, ws in self.chunks():
+            graph.add_arrays(us, vs, ws)
+        return graph
+
+    def save(self, path: str, directed: bool = False, n_verticies: int | None = None,
+            gap: int|float = -1) -> None:
+        """Writes the weighted graph to the binary file "path" without building it in memory.
+
+        The first pass counts degrees, the second one writes every arrow to its
+        place in the mapped output file. Then every row is sorted by target and
+        compacted in place, of duplicate arrows the last one wins as in "load".
+        The memory is O(V + chunk_size + maximum degree).
+        Open the file with "UGraph.load" or "DGraph.load".
+        """
+
+        degrees: array = array('q', bytes(8 * (n_verticies or 0)))
+        wtype: str = 'q'
+
+        for us, vs, ws in self.chunks():
+            if ws is not None and ws.typecode == 'd':
+                wtype = 'd'
+            for pair in ((us, vs), (vs, us))[:1 if directed else 2]:
+                for u in pair[0]:
+                    if u >= len(degrees):
+                        degrees.extend(repeat(0, u + 1 - len(degrees)))
+                    degrees[u] += 1
+
+        n: int = len(degrees)
+        offsets: array = array('q', [0])
+        for d in degrees:
+            offsets.append(offsets[-1] + d)
+        nnz: int = offsets[-1]
+
+        kind: str = DGraph._kind if directed else UGraph._kind
+        _write_graph(path, kind, True, gap, offsets,
+                array('q', bytes(8 * nnz)), array(wtype, bytes(8 * nnz)))
+
+        with open(path, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), 0)
+
+        start: int = _GRAPH_FILE.header_size + 8 * (n + 1)
+        targets: memoryview = memoryview(mm)[start:start + 8 * nnz].cast('q')
+        weights: memoryview = memoryview(mm)[start + 8 * nnz:start + 16 * nnz].cast(wtype)
+        position: array = offsets[:-1]    # The next free place in every row
+
+        for us, vs, ws in self.chunks():
+            for i, edge in enumerate(zip(us, vs)):
+                w: int|float = 1 if ws is None else ws[i] or 1    # No weight means 1
+                for u, v in (edge, edge[::-1])[:1 if directed else 2]:
+                    k: int = position[u]
+                    targets[k] = v
+                    weights[k] = w
+                    position[u] += 1
+
+        size: int = 0    # The number of arrows without duplicates
+        for u in range(n):
+            row: dict[int, int|float] = {}
+            for k in range(offsets[u], offsets[u + 1]):
+                row[targets[k]] = weights[k]
+
+            offsets[u] = size
+            for v in sorted(row):
+                targets[size] = v
+                weights[size] = row[v]
+                size += 1
+        offsets[n] = size
+
+        targets.release()
+        weights.release()
+
+        mm.move(start + 8 * size, start + 8 * nnz, 8 * size)    # Weights follow the targets
+        mm[_GRAPH_FILE.header_size:start] = offsets.tobytes()
+        mm[:_GRAPH_FILE.header_size] = _GRAPH_FILE.pack(kind.encode(), True, wtype.encode(), n, size, gap)
+        mm.close()
+        os.truncate(path, start + 16 * size)
+
+        if sys.byteorder == 'big':    # The arrays were written in the native byte order
+            self.__byteswap(path, _GRAPH_FILE.header_size, n + 1 + 2 * size)
+
+    def __byteswap(self, path: str, start: int, size: int) -> None:
+        """Swaps bytes of "size" 8-byte items of the file from "start" chunk by chunk"""
+
+        with open(path, 'r+b') as f:
+            f.seek(start)
+            for _ in range(0, size, self.__chunk_size):
+                buf: array = array('q')
+                buf.frombytes(f.read(8 * min(self.__chunk_size, size)))
+                buf.byteswap()
+                f.seek(-8 * len(buf), 1)
+                f.write(buf)
+                size -= len(buf)
+
+    @property
+    def n_edges(self) -> int:
+        """The number of edges read by the last pass"""
+        return self.__edges
+
+    @property
+    def seconds(self) -> float:
+        """Time of the last pass"""
+        return self.__seconds
+
+    @property
+    def throughput(self) -> float:
+        """Edges per second of the last pass"""
+        return self.__edges / self.__seconds if self.__seconds else 0.0
+
+    @property
+    def ids(self) -> MappingProxyType[str, int]:
+        """The map of vertex ids to verticies (with "remap")"""
+        return MappingProxyType(self.__ids)
+
+
 if __name__ == '__main__':
     
     # Directed graph with the a flow
@@ -184,6 +1467,23 @@ if __name__ == '__main__':
 
     assert len(fg.verticies) == n_verticies, "Something wrong with number of verticies in a flow graph"
     assert flow_matrix == fg.cost_matrix, "Something wrong with creating cost matrix in a flow graph"
+
+    # Arcs of the flow graph: the arrow 2k and its reverse arc 2k+1
+    assert fg.n_arrows == 8 and fg.head[0:2] == array('q', [1, 0]), "Something wrong with arcs in a flow graph"
+    assert sorted(fg.head[a] for a in fg.arcs(1)) == [0, 2, 4], "Something wrong with arcs leaving a vertex"
+
+    flows: array = fg.snapshot()
+    fg.flow[0], fg.flow[1] = 5, -5
+    assert fg.cost_matrix[0][1] == [20, 5, 1], "Something wrong with a flow in a flow graph"
+    fg.restore(flows)
+    assert flow_matrix == fg.cost_matrix, "Something wrong with restoring flows in a flow graph"
+
+    try:
+        fg.restore(flows[:-2])
+    except ValueError:
+        pass
+    else:
+        assert False, "Flows of other arcs are restored"
         
     dg = DGraph(8, weighted=False)
     dg.add_arrow(0, 1)
@@ -198,12 +1498,14 @@ if __name__ == '__main__':
     dg.add_arrow(7, 5)
     dg.add_arrow(7, 6)
 
-    adjacency_list: dict[int, list[int]]
-    adjacency_list = {0: [1, 2], 2: [3, 4], 3: [4], 4: [0], 5: [1], 6: [4, 5], 7: [5, 6]}
+    adjacency_list: dict[int, tuple[int, ...]]
+    adjacency_list = {0: (1, 2), 2: (3, 4), 3: (4,), 4: (0,), 5: (1,), 6: (4, 5), 7: (5, 6)}
     assert dg.adjacency_list == adjacency_list, "something wrong with the adjacency list in the directed graph"    
 
     arrow_list = {(0, 1), (0, 2), (2, 3), (2, 4), (3, 4), (4, 0), (5, 1), (6, 4), (6, 5), (7, 5), (7, 6)}
     assert set(dg.arrow_list) == arrow_list, "something wrong with the arrow list in the directed graph"
+    assert set(dg.reverse().arrow_list) == {(v, u) for u, v in arrow_list}, "something wrong with the reversed graph"
+    assert dg.reversed_graph is dg.reversed_graph and dg.reversed_graph.arrow_list == dg.reverse().arrow_list, "something wrong with the cached reversed graph"
 
     # Test adjacency matrix in a directed graph
     dwg = DGraph(5, gap=0, weighted=True)
@@ -254,7 +1556,7 @@ if __name__ == '__main__':
     assert len(uwg.verticies) == n_verticies, "Something wrong with a number of verticies in the undirected graph"
     cond = (ud_cost_matrix_true == uwg.cost_matrix)
     assert cond, "Something wrong with a cost matrix in the undirected graph"
-    assert ud_edge_list_true == uwg.edge_list, "Something wrong with an edge list in the undirected graph"
+    assert ud_edge_list_true == list(uwg.edge_list), "Something wrong with an edge list in the undirected graph"
 
     # The undirected graph
     ug = UGraph(6, weighted=True)
@@ -268,5 +1570,174 @@ if __name__ == '__main__':
     ug.add_edge(3, 4, 8)
 
     expected_list = [(1, 0, 1), (4, 0, 2), (5, 1, 3), (2, 2, 3), (6, 2, 4), (8, 3, 4), (7, 3, 5), (3, 4, 5)]
-    assert expected_list == ug.edge_list, "Something wrong with an edge list in the undirected graph"
+    assert expected_list == list(ug.edge_list), "Something wrong with an edge list in the undirected graph"
+
+
+    # The same graphs in the compressed sparse row storage
+    dg_csr = DGraph(8, weighted=False, storage='csr')
+    for arrow in dg.arrow_list:
+        dg_csr.add_arrow(*arrow)
+    assert dg_csr.adjacency_list == adjacency_list, "something wrong with the adjacency list in the CSR directed graph"
+    assert dg_csr.arrow_list == dg.arrow_list, "something wrong with the arrow list in the CSR directed graph"
+
+    ug_csr = UGraph(6, weighted=True, storage='csr')
+    for w, u, v in reversed(expected_list):
+        ug_csr.add_edge(u, v, w)
+    assert expected_list == list(ug_csr.edge_list), "Something wrong with an edge list in the CSR undirected graph"
+    assert ug.cost_matrix == ug_csr.cost_matrix, "Something wrong with a cost matrix in the CSR undirected graph"
+
+    ug_csr.add_edge(0, 1, 2.5)    # Overwrites the weight of (0, 1)
+    assert ug_csr.weight(1, 0) == 2.5, "Something wrong with updating a weight in the CSR undirected graph"
+    assert ug_csr.edge_list[0] == (2.5, 0, 1), "Something wrong with updating a weight in the CSR undirected graph"
+
+    # Cached views and the version of the graph
+    version: int = ug_csr.version
+    assert ug_csr.edge_list is ug_csr.edge_list, "The edge list is not cached"
+    ug_csr.add_edge(0, 5, 9)
+    assert ug_csr.version == version + 1, "Something wrong with the version of the graph"
+    assert ug_csr.adjacency_list[5] == (0, 3, 4), "The adjacency list is stale"
+    assert ug_csr.max_int_weight is None, "2.5 is not an integer weight"
+    assert UGraph.from_edges(6, expected_list, weighted=True, storage='csr').max_int_weight == 8, "Something wrong with the maximum integer weight"
+
+    dg.add_arrow(1, 3)
+    assert dg.adjacency_list[1] == (3,), "The adjacency list is stale"
+
+    # Bulk ingestion of edges
+    ug_bulk = UGraph.from_edges(6, expected_list, weighted=True, storage='csr')
+    assert list(ug_bulk.edge_list) == expected_list, "Something wrong with bulk ingestion of edges"
+
+    us, vs, ws = array('q', [0, 0, 2, 3, 3]), array('q', [1, 2, 3, 1, 4]), [5, 3, 2, 1, 4]
+    for storage in ('matrix', 'csr'):
+        dg_bulk = DGraph.from_arrays(5, us, vs, ws, gap=0, weighted=True, storage=storage)
+        dg_bulk.add_edges_from([(6, 0, 3), (10, 1, 4)])
+        assert dg_bulk.cost_matrix == adjacency_matrix_true, "Something wrong with bulk ingestion of arrows"
+
+    try:
+        DGraph.from_arrays(5, us, array('q', [1, 2, 3, 1, 5]))
+    except IndexError:
+        pass
+    else:
+        assert False, "Bounds of verticies are not checked in bulk"
 
+    fg_bulk = FGraph.from_edges(5, [(20, 0, 1), (30, 0, 2), (10, 0, 3), (40, 1, 2),
+            (30, 1, 4), (10, 2, 3), (20, 2, 4), (20, 3, 4)])
+    assert fg_bulk.cost_matrix == flow_matrix, "Something wrong with bulk ingestion of a flow graph"
+
+    # The binary graph file
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'graph.bin')
+
+        for graph in (uwg, ug_csr, dg, dwg):
+            graph.save(path)
+            loaded = Graph.load(path)
+            assert type(loaded) is type(graph), "Something wrong with the kind of a loaded graph"
+            assert loaded.cost_matrix == graph.cost_matrix, "Something wrong with a loaded graph"
+
+        loaded = DGraph.load(path)
+        loaded.add_arrow(4, 1, 7)    # A loaded graph stays mutable
+        assert loaded.weight(4, 1) == 7 and loaded.weight(0, 1) == 5, "Something wrong with changing a loaded graph"
+
+        try:
+            UGraph.load(path)
+        except ValueError:
+            pass
+        else:
+            assert False, "A directed graph is loaded as an undirected one"
+
+        DGraph(3, storage='csr').save(path)
+        assert Graph.load(path).arrow_list == (), "Something wrong with a loaded empty graph"
+
+        fg.save(path)
+        assert FGraph.load(path).cost_matrix == flow_matrix, "Something wrong with a loaded flow graph"
+
+        # The streaming edge list reader
+        edges_path = os.path.join(tmp, 'edges.txt')
+        with open(edges_path, 'w') as f:
+            f.write("# u v w\n")
+            for w, u, v in expected_list:
+                f.write(f"v{u} v{v} {w}\n")
+
+        reader = EdgeListReader(edges_path, chunk_size=3, remap=True)
+        ug_text = reader.load(UGraph, weighted=True, storage='csr')
+        assert reader.n_edges == len(expected_list), "Something wrong with reading an edge list"
+        assert reader.ids['v5'] == 5 and list(ug_text.edge_list) == expected_list, "Something wrong with an edge list file"
+        print(f"Edge list: {reader.n_edges} edges, {reader.throughput:.0f} edges/sec")
+
+        reader.save(path)
+        assert UGraph.load(path).cost_matrix == ug.cost_matrix, "Something wrong with writing an edge list file to disk"
+
+        with open(edges_path, 'w') as f:    # The same edge twice, the last weight wins
+            f.write("0 1 5\n1 0 7\n")
+
+        reader = EdgeListReader(edges_path)
+        reader.save(path)
+        saved = UGraph.load(path)
+        assert saved.edge_list == reader.load(weighted=True).edge_list == ((7, 0, 1),), "Something wrong with duplicate edges on disk"
+        assert saved.adjacency_list[0] == (1,) and saved.weight(0, 1) == saved.weight(1, 0) == 7, "Something wrong with duplicate edges on disk"
+
+        with open(edges_path, 'w') as f:    # No capacities
+            f.write("0 1\n1 2\n")
+
+        try:
+            EdgeListReader(edges_path).load(FGraph)
+        except ValueError:
+            pass
+        else:
+            assert False, "A flow graph is loaded without capacities"
+
+    for storage in ('matrix', 'csr', 'numpy')[:3 if np is not None else 2]:
+        ug_twice = UGraph(2, weighted=True, storage=storage)    # The same edge twice, the last weight wins
+        ug_twice.add_arrays([0, 1], [1, 0], [5, 7])
+        assert ug_twice.weight(0, 1) == ug_twice.weight(1, 0) == 7, f"Something wrong with a repeated edge in the {storage} graph"
+
+    # The NumPy dense matrix
+    if np is not None:
+        for dtype in ('int32', 'float32', 'float64'):
+            ug_np = UGraph.from_edges(6, expected_list, weighted=True, storage='numpy', dtype=dtype)
+            assert list(ug_np.edge_list) == expected_list, "Something wrong with an edge list of the NumPy graph"
+            assert (ug_np.cost_matrix == np.array(ug.cost_matrix)).all(), "Something wrong with the NumPy cost matrix"
+            assert (ug_np.max_int_weight is None) == dtype.startswith('float'), "Something wrong with integer weights of the NumPy graph"
+
+        dg_np = DGraph(8, storage='numpy', dtype='int32')
+        dg_np.add_edges_from(dg.arrow_list)
+        assert dg_np.adjacency_list == dg.adjacency_list, "Something wrong with the adjacency list of the NumPy graph"
+        assert dg_np.arrow_list == dg.arrow_list, "Something wrong with the arrow list of the NumPy graph"
+
+    # Changing graphs and the change log
+    sparse = UGraph.from_edges(6, expected_list, weighted=True, storage='csr', gap=float('inf'))
+    sparse.remove_edge(0, 2)
+    assert sparse.max_int_weight == 8 and sparse.weight(3, 4) == 8 and isinstance(sparse.weight(3, 4), int), "Removing an edge changed integer weights"
+    assert sparse.weight(0, 2) == float('inf') and 2 not in sparse.adjacency_list[0], "Something wrong with removing a CSR edge"
+    unlogged = UGraph(4, log_size=0)
+    unlogged.add_edge(0, 1)
+    assert unlogged.changes(0) is None and unlogged.changes(1) == [], "Something wrong with a graph without the change log"
+
+    for storage in ('matrix', 'csr', 'numpy')[:3 if np is not None else 2]:
+        road = UGraph.from_edges(6, expected_list, weighted=True, storage=storage, log_size=2)
+        version = road.version
+        road.adjacency_list, road.edge_list, road.max_int_weight    # Cached views are patched by changes
+
+        road.update_weight(3, 4, 1)
+        road.remove_edge(0, 2)
+        assert road.changes(version) == [(version + 1, 3, 4, 8, 1), (version + 2, 0, 2, 4, -1)], "Something wrong with the change log"
+        assert road.changes(version - 1) is None, "Edges added in bulk are in the change log"
+
+        assert road.changes(road.version) == [], "Something wrong with the change log of the current version"
+
+        road.add_edge(1, 5, 2)
+        assert road.changes(version) is None, "The change log is not bounded"
+        assert road.changes(version + 2) == [(version + 3, 1, 5, -1, 2)], "Something wrong with the change log"
+
+        expected_road = [(1, 0, 1), (5, 1, 3), (2, 1, 5), (2, 2, 3), (6, 2, 4), (1, 3, 4), (7, 3, 5), (3, 4, 5)]
+        assert list(road.edge_list) == expected_road, f"Something wrong with changing the {storage} graph"
+        assert road.adjacency_list[0] == (1,) and road.weight(2, 0) == -1, "Something wrong with removing an edge"
+        assert road.adjacency_list == road._adjacency_list() and road.max_int_weight == road._max_int_weight(), "Something wrong with patching views"
+
+        try:
+            road.remove_edge(0, 2)
+        except KeyError:
+            pass
+        else:
+            assert False, "A missing edge is removed"
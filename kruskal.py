@@ -5,7 +5,13 @@
 Дано:    Связный неориентированный граф "G(V, E)".
 Задача:  Построить минимальное остовное дерево "T".
 """
-from graphs import UGraph
+from array import array
+from heapq import merge
+import os
+import tempfile
+from typing import Iterator
+from graphs import EdgeListReader, UGraph, check_arrays
+from union_find import DisjointSet
 
 
 EdgeType = tuple[int, int, int]
@@ -13,6 +19,8 @@ EdgeType = tuple[int, int, int]
 class Kruskal:
     def __init__(self, G: UGraph):
 
+        self.__n: int = len(G.verticies)    # The number of verticies
+
         # The edge list of the Graph
         self.__edge: list[EdgeType]   # [(u, v, weight), ...]
         self.__edge= G.edge_list    # type: ignore            
@@ -21,62 +29,163 @@ class Kruskal:
         self.__run()
 
     def __run(self) -> None:
-        """Run Kruskal's algorithm"""
+        """Run Kruskal's algorithm. O(E log E)"""
 
         edge_list = sorted(self.__edge, key=lambda x: x[0])
-
-        S: set[int] = set()    # Visited verticies
-        D: dict[int, list[int]] = {}       # Spanning tree with isolated verticies
+        dsu = DisjointSet(self.__n)    # Components of the spanning forest
 
         edge = EdgeType
         for edge in edge_list:
-            
+
             _, u, v = edge    # weight, vertice 1, vertice 2
-            if u not in S or v not in S:
-                
-                if u not in S and v not in S:
-                    D[u] = [u, v]
-                    D[v] = D[u]
-                
-                if u in S:
-                    D[u].append(v)
-                    D[v] = D[u]
-                else:
-                    D[v].append(u)
-                    D[u] = D[v]
-                    
+            if dsu.union(u, v):
                 self.__T.append(edge)
-                S.add(v)
-                S.add(u)
 
-        # connecting connected components (maximal connected subgraph)
-        for edge in edge_list:
-            _, u, v = edge     # weight, vertice 1, vertice 2
+                if len(self.__T) == self.__n - 1:    # The tree is spanning
+                    break
+
+    @property
+    def tree(self) -> list[EdgeType]:
+        return self.__T
+
+
+def _read_run(path: str, typecode: str, count: int, block: int) -> Iterator[EdgeType]:
+    """Yields the edges (weight, u, v) of a sorted run, "block" edges in memory"""
+
+    size: int = array(typecode).itemsize
+    with open(path, 'rb') as f:    # One file per run: the columns are read by seeking
+
+        for start in range(0, count, block):
+            k: int = min(block, count - start)
+            ws, us, vs = array(typecode), array('q'), array('q')
+
+            f.seek(size * start)
+            ws.fromfile(f, k)
+            f.seek(size * count + 8 * start)
+            us.fromfile(f, k)
+            f.seek(size * count + 8 * (count + start))
+            vs.fromfile(f, k)
+
+            yield from zip(ws, us, vs)
+
+
+class ExternalKruskal:
+    """Kruskal's algorithm for edge lists larger than memory.
+
+    Every chunk of the reader (its "chunk_size" edges) is sorted by weight and
+    written to a temporary file as a run: weights, then us, then vs. The runs
+    are merged lazily by a heap, reading "block" edges of each run at a time,
+    into the disjoint sets, until V - 1 edges are accepted. Memory is
+    O(V + chunk_size + runs * block), time O(E log E). A run keeps one file
+    open while merging, so E / chunk_size must stay below the open files limit.
+    """
+
+    def __init__(self, reader: EdgeListReader, block: int = 1 << 12) -> None:
+        self.__reader: EdgeListReader = reader
+        self.__block: int = block
 
-            if u not in D[v]:
-                
+        self.__n: int = 0    # The number of verticies: one more than the maximum vertex
+        self.__runs: int = 0    # The number of sorted runs
+        self.__T: list[EdgeType] = []    # A minimum spanning tree (forest)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.__run(tmp)
+
+    def __sort_runs(self, tmp: str) -> list[Iterator[EdgeType]]:
+        """Writes the sorted runs to "tmp", returns their readers"""
+
+        runs: list[Iterator[EdgeType]] = []
+
+        for us, vs, ws in self.__reader.chunks():
+
+            if ws is None:    # "u v" lines, every weight is 1
+                ws = array('q', [1]) * len(us)
+            self.__n = max(self.__n, max(us) + 1, max(vs) + 1)
+            check_arrays(self.__n, us, vs, ws)
+
+            order: list[int] = sorted(range(len(ws)), key=ws.__getitem__)
+            path: str = os.path.join(tmp, f'run{len(runs)}.bin')
+            with open(path, 'wb') as f:
+                for column in (ws, us, vs):
+                    array(column.typecode, (column[i] for i in order)).tofile(f)
+
+            runs.append(_read_run(path, ws.typecode, len(order), self.__block))
+
+        self.__runs = len(runs)
+        return runs
+
+    def __run(self, tmp: str) -> None:
+        """Run Kruskal's algorithm on the merged runs"""
+
+        runs: list[Iterator[EdgeType]] = self.__sort_runs(tmp)
+        dsu = DisjointSet(self.__n)
+
+        for edge in merge(*runs):
+
+            _, u, v = edge    # weight, vertice 1, vertice 2
+            if dsu.union(u, v):
                 self.__T.append(edge)
-                D[v] += D[u]
-                D[u] = D[v]
+
+                if len(self.__T) == self.__n - 1:    # The tree is spanning
+                    break
+
+        for run in runs:    # Close the files of unfinished runs
+            run.close()    # type: ignore
 
     @property
     def tree(self) -> list[EdgeType]:
         return self.__T
 
-
-G = UGraph(6, weighted=True)
-G.add_edge(0, 1, 1)
-G.add_edge(2, 3, 2)
-G.add_edge(4, 5, 3)
-G.add_edge(0, 2, 4)
-G.add_edge(1, 3, 5)
-G.add_edge(2, 4, 6)
-G.add_edge(3, 5, 7)
-G.add_edge(3, 4, 8)
-txt = '''Kruskal's algorithm finds a minimum spanning tree of an undirected edge-weighted graph. '''
-print(txt)            
-
-krs = Kruskal(G)
-T = krs.tree
-print(T)
-    
+    @property
+    def runs(self) -> int:
+        """The number of sorted runs written to disk"""
+        return self.__runs
+
+
+if __name__ == '__main__':
+
+    G = UGraph(6, weighted=True)
+    G.add_edge(0, 1, 1)
+    G.add_edge(2, 3, 2)
+    G.add_edge(4, 5, 3)
+    G.add_edge(0, 2, 4)
+    G.add_edge(1, 3, 5)
+    G.add_edge(2, 4, 6)
+    G.add_edge(3, 5, 7)
+    G.add_edge(3, 4, 8)
+    txt = '''Kruskal's algorithm finds a minimum spanning tree of an undirected edge-weighted graph. '''
+    print(txt)            
+
+    krs = Kruskal(G)
+    T = krs.tree
+    print(T)
+
+    assert T == [(1, 0, 1), (2, 2, 3), (3, 4, 5), (4, 0, 2), (6, 2, 4)], "Something wrong with the minimum spanning tree"
+
+    # A forest: the trees of the components
+    F = UGraph(5, weighted=True)
+    F.add_edge(0, 1, 3)
+    F.add_edge(1, 2, 1)
+    F.add_edge(0, 2, 2)
+    F.add_edge(3, 4, 5)
+    assert Kruskal(F).tree == [(1, 1, 2), (2, 0, 2), (5, 3, 4)], "Something wrong with the minimum spanning forest"
+
+    # The same graph streamed from an edge list file in runs of 3 edges
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'edges.txt')
+        with open(path, 'w') as f:
+            for w, u, v in G.edge_list:
+                f.write(f"{u} {v} {w}\n")
+
+        external = ExternalKruskal(EdgeListReader(path, chunk_size=3), block=2)
+        assert external.tree == T and external.runs == 3, "Something wrong with the external Kruskal's algorithm"
+
+        with open(path, 'w') as f:    # Weights of only some edges
+            f.write("0 1\n1 2 9\n2 3 1\n0 3\n")
+
+        try:
+            ExternalKruskal(EdgeListReader(path, chunk_size=3))
+        except ValueError:
+            pass
+        else:
+            assert False, "Edges with and without weights are mixed"
@@ -0,0 +1,100 @@
+"""
+Система непересекающихся множеств (Disjoint Set Union).
+
+Дано:   элементы 0, 1, ..., n - 1, каждый в своем множестве.
+Задача: объединять множества и проверять, лежат ли два элемента
+        в одном множестве. Сложность: O(α(n)) на операцию.
+"""
+from array import array
+from graphs import UGraph
+
+
+class DisjointSet:
+    """Disjoint sets of the elements 0, ..., n - 1.
+
+    Parents and ranks are typed arrays, "find" halves the path (every
+    vertex on it is linked to its grandparent) and "union" hangs the tree of
+    the lower rank under the other one.
+    """
+
+    def __init__(self, n: int) -> None:
+        self.__parent: array = array('q', range(n))
+        self.__rank: array = array('B', bytes(n))    # The rank is below log2(n) < 256
+        self.__n_sets: int = n
+
+    def find(self, x: int) -> int:
+        """Returns the representative of the set of "x"."""
+
+        parent = self.__parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> bool:
+        """Merges the sets of "x" and "y", False if they are the same set"""
+
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+
+        rank = self.__rank
+        if rank[x] < rank[y]:
+            x, y = y, x
+        self.__parent[y] = x
+        if rank[x] == rank[y]:
+            rank[x] += 1
+
+        self.__n_sets -= 1
+        return True
+
+    def connected(self, x: int, y: int) -> bool:
+        return self.find(x) == self.find(y)
+
+    def groups(self) -> list[list[int]]:
+        """Returns the sets, every one sorted, ordered by their least elements"""
+
+        D: dict[int, list[int]] = {}
+        for x in range(len(self.__parent)):
+            D.setdefault(self.find(x), []).append(x)
+        return list(D.values())
+
+    def __len__(self) -> int:
+        return len(self.__parent)
+
+    @property
+    def n_sets(self) -> int:
+        """The number of sets"""
+        return self.__n_sets
+
+
+def components(G: UGraph) -> DisjointSet:
+    """Connected components of the graph: connected(u, v), groups(), n_sets. O(V + E α(V))"""
+
+    dsu = DisjointSet(len(G.verticies))
+    for u in G.verticies:
+        for v, _ in G.neighbors(u):
+            if u < v:
+                dsu.union(u, v)
+    return dsu
+
+
+if __name__ == '__main__':
+
+    txt = "A disjoint-set data structure stores a partition of a set into disjoint subsets."
+    print(txt)
+
+    dsu = DisjointSet(6)
+    assert dsu.union(0, 1) and dsu.union(2, 3) and dsu.union(1, 3), "Something wrong with union"
+    assert not dsu.union(0, 2), "0 and 2 are in the same set"
+    assert dsu.connected(0, 3) and not dsu.connected(0, 4), "Something wrong with connected"
+    assert dsu.groups() == [[0, 1, 2, 3], [4], [5]] and dsu.n_sets == 3, "Something wrong with groups"
+
+    G = UGraph(7)
+    G.add_edge(0, 1)
+    G.add_edge(1, 2)
+    G.add_edge(3, 4)
+    G.add_edge(5, 5)
+    cc = components(G)
+    assert cc.groups() == [[0, 1, 2], [3, 4], [5], [6]], "Something wrong with connected components"
+    print(cc.groups())